@@ -13,6 +13,8 @@ from __future__ import print_function
 from builtins import input
 
 import random
+import shutil
+import sys
 import time
 from termcolor import colored, COLORS
 
@@ -21,6 +23,7 @@ CARD_SUIT = ("♡", "♢", "♧", "♤")
 SYSTEM_COLORS = ['grey', 'white']
 PLAYER_COLORS = list(c for c in COLORS.keys() if c not in SYSTEM_COLORS)
 MAX_PLAYERS = len(PLAYER_COLORS)
+DEAL_DELAY = 1
 
 
 class Card(object):
@@ -51,18 +54,22 @@ class Card(object):
         return self.rank == "A"
 
 class Deck(object):
-    """Represents deck of 52 cards to be dealt to the player and dealer"""
+    """Represents one or more decks of 52 cards to be dealt to the player and dealer"""
 
-    def __init__(self):
+    def __init__(self, rng=None, decks=1):
+        assert decks > 0
+        self.rng = rng or random
+        self.decks = decks
         self.__new_deck()
 
     def __new_deck(self):
-        """Create a new deck of 52 cards"""
-        self.cards = list(Card(r, s) for r in CARD_RANK for s in CARD_SUIT)
+        """Create a new deck of 52 cards for each deck in use"""
+        self.cards = list(Card(r, s)
+                          for _ in range(self.decks) for r in CARD_RANK for s in CARD_SUIT)
 
     def shuffle(self):
         """Randomly shuffle the deck of cards"""
-        random.shuffle(self.cards)
+        self.rng.shuffle(self.cards)
 
     def deal(self):
         """Deal from the end of the deck - if the deck is empty, start a new one"""
@@ -79,6 +86,7 @@ class Hand(object):
         self.cards = []
         self.stake = stake
         self.active = True
+        self.actions = ''
 
     def __repr__(self):
         return "  ".join(str(card) for card in self.cards)
@@ -106,6 +114,11 @@ class Hand(object):
             value -= 10
         return value
 
+    def soft(self):
+        """Determine if the hand is counting an Ace as 11"""
+        hard = sum(1 if c.ace() else c.value() for c in self.cards)
+        return hard != self.value()
+
     def blackjack(self):
         """Determine if the hand is 'blackjack'"""
         return len(self.cards) == 2 and self.value() == 21
@@ -199,7 +212,7 @@ class Player(object):
 class Game(object):
     """Controls the actions of the game"""
 
-    def __init__(self, names, chips):
+    def __init__(self, names, chips, history=None, view=None):
         self.deck = Deck()
         self.deck.shuffle()
         self.colors = list(PLAYER_COLORS)
@@ -208,6 +221,10 @@ class Game(object):
         self.playing = False
         self.dealer = None
         self.insurance = False
+        self.history = history
+        self.view = view
+        self.round = 0
+        self.reveal = False
 
     def __get_color(self):
         """Obtain a random color from available termcolors"""
@@ -222,28 +239,34 @@ class Game(object):
         card = self.deck.deal()
         hand.add_card(card)
         if announce:
-            time.sleep(1)
+            time.sleep(DEAL_DELAY)
             prompt = "dealt {}  {:>2} : {}".format(card, hand.value(), hand)
-            print(self.format_text(name, prompt, color))
+            self.announce(name, prompt, color)
 
     def __get_bet(self, player, question, minimum, multiple):
         """Ask player for their bet and check constraints on answer"""
-        print()
-        print(self.format_text(player.name, question.lower(), player.color))
-        prompt = "{} available, {} minimum, multiples of {} only".format(
-            player.chips, minimum, multiple)
-        print(self.format_text(player.name, prompt, player.color))
+        if self.view is not None:
+            # the view shows the player's chips, so the question is asked alone
+            question = "{} ({} minimum, multiples of {}): ".format(
+                question.lower(), minimum, multiple)
+        else:
+            self.say()
+            self.say(player.name, question.lower(), player.color)
+            prompt = "{} available, {} minimum, multiples of {} only".format(
+                player.chips, minimum, multiple)
+            self.say(player.name, prompt, player.color)
+            question = "enter amount ({}): ".format(minimum)
         bet = -1
         while bet < minimum or bet > player.chips or bet % multiple != 0:
-            bet = input(self.format_text(
-                player.name, "enter amount ({}): ".format(minimum), player.color))
+            self.ready()
+            bet = input(self.format_text(player.name, question, player.color))
             if bet == '':
                 bet = minimum
             else:
                 try:
                     bet = int(bet)
                 except ValueError:
-                    pass
+                    bet = -1
         return bet
 
     def format_text(self, name, text, color="white"):
@@ -251,6 +274,31 @@ class Game(object):
         name = name.rjust(self.max_name_len)
         return colored("{} > {}".format(name, text), color)
 
+    def say(self, name="", text="", color="white"):
+        """Show a message from the named player, or a blank line"""
+        if self.view is not None:
+            if text:
+                self.view.message(name, text, color)
+        elif text:
+            print(self.format_text(name, text, color))
+        else:
+            print()
+
+    def ready(self):
+        """Make way for a question to a player"""
+        if self.view is not None:
+            self.view.prompt()
+
+    def announce(self, name, text, color="white"):
+        """Show a message describing the cards on the table
+
+        The table view displays the cards itself, so only redraws.
+        """
+        if self.view is not None:
+            self.view.refresh()
+        else:
+            self.say(name, text, color)
+
     def players_with_chips(self, min=0):
         """Returns a list of players with chips remaining"""
         return list(p for p in self.players if p.has_chips(min))
@@ -269,6 +317,8 @@ class Game(object):
         """Obtain bets and deal two cards to the player and the dealer"""
         hands = []
         self.playing = True
+        self.reveal = False
+        self.round += 1
         min_bet = 10
         random.shuffle(self.players)
         players = self.players_with_chips(min_bet)
@@ -286,13 +336,13 @@ class Game(object):
             for hand in hands:
                 self.__deal_card(_, hand, announce=False)
             self.__deal_card(_, dealer, announce=False)
-        print()
+        self.dealer = dealer
+        self.say()
         for player in players:
             hand = player.hands[0]
             prompt = "hand dealt {:>2} : {}".format(hand.value(), hand)
-            print(self.format_text(player.name, prompt, player.color))
-        print(self.format_text("Dealer", "face up card  : {}".format(dealer.first())))
-        self.dealer = dealer
+            self.announce(player.name, prompt, player.color)
+        self.announce("Dealer", "face up card  : {}".format(dealer.first()))
 
     def offer_insurance(self):
         """Offer insurance if applicable"""
@@ -311,22 +361,21 @@ class Game(object):
         players = self.active_players()
         if dealer.blackjack():
             self.playing = False
-            print()
-            print(self.format_text("Dealer", "scored blackjack : {}".format(dealer)))
+            self.reveal = True
+            self.say()
+            self.say("Dealer", "scored blackjack : {}".format(dealer))
             for player in players:
                 for hand in player.active_hands():
                     if player.insurance:
-                        print(self.format_text(
-                            player.name, "you won your insurance bet!", player.color))
+                        self.say(player.name, "you won your insurance bet!", player.color)
                         player.win(player.insurance, odds=2)
                     self.settle_outcome(dealer, player, hand)
         elif dealer.first().ace():
-            print()
-            print(self.format_text("Dealer", "did not score blackjack"))
+            self.say()
+            self.say("Dealer", "did not score blackjack")
             for player in players:
                 if player.insurance:
-                    print(self.format_text(
-                        player.name, "you lost your insurance bet!", player.color))
+                    self.say(player.name, "you lost your insurance bet!", player.color)
                     player.loss()
 
     def check_for_player_blackjack(self):
@@ -336,9 +385,17 @@ class Game(object):
         for player in players:
             for hand in player.active_hands():
                 if hand.blackjack():
-                    print(self.format_text(player.name, "you scored blackjack!", player.color))
+                    self.say(player.name, "you scored blackjack!", player.color)
                     self.settle_outcome(dealer, player, hand)
 
+    def record(self, player, hand, payout):
+        """Append the settled hand to the hand history, if one is kept"""
+        if self.history is not None:
+            self.history.append(self.round, player.name,
+                                hand.cards[0].rank, hand.cards[1].rank,
+                                self.dealer.first().rank, hand.actions,
+                                hand.value(), self.dealer.value(), payout)
+
     def settle_outcome(self, dealer, player, hand):
         """Decide the outcome of the player's hand compared to the dealer"""
         hand.active = False
@@ -349,22 +406,29 @@ class Game(object):
             else:
                 odds = 1
             player.win(hand.stake, odds)
+            payout = int(hand.stake * (odds + 1)) - hand.stake
         elif hand.value() == dealer.value():
             outcome = "you tied with the dealer :|"
             player.push(hand.stake)
+            payout = 0
         else:
             outcome = "you lost to the dealer :("
             player.loss()
-        print(self.format_text(player.name, outcome, player.color))
+            payout = -hand.stake
+        self.record(player, hand, payout)
+        self.say(player.name, outcome, player.color)
 
     def split_hand(self, player, hand):
         """Split player's hand if possible"""
         if hand.pair() and player.has_chips(hand.stake):
             prompt = "would you like to split your pair? (Y/n): "
             prompt = self.format_text(player.name, prompt, player.color)
+            self.ready()
             resp = get_response(prompt, ("Y", "N"), "Y")
             if resp == "Y":
+                hand.actions += 'P'
                 new_hand = hand.split()
+                new_hand.actions = hand.actions
                 player.bet(hand.stake)
                 self.__deal_card(player.name, hand, player.color)
                 self.__deal_card(player.name, new_hand, player.color)
@@ -377,9 +441,10 @@ class Game(object):
 
     def bust(self, player, hand):
         """Handle a player's hand that has busted"""
-        print(self.format_text(player.name, "busted! :(", player.color))
+        self.say(player.name, "busted! :(", player.color)
         player.loss()
         hand.active = False
+        self.record(player, hand, -hand.stake)
 
     def double_down(self, player, hand):
         """Player wishes to double their bet and receive one more card"""
@@ -392,23 +457,24 @@ class Game(object):
     def dealer_turn(self):
         """Controls the dealer's turn and determines the outcome of the game"""
         dealer = self.dealer
-        print()
+        self.reveal = True
+        self.say()
         prompt = "turns {}  {:>2} : {}".format(
             dealer.last(),
             dealer.value(),
             dealer)
-        print(self.format_text("Dealer", prompt))
+        self.announce("Dealer", prompt)
         while dealer.value() < 17:
             self.__deal_card("Dealer", dealer)
         if dealer.bust():
-            print(self.format_text("Dealer", "busted!"))
+            self.say("Dealer", "busted!")
         for player in self.active_players():
             for hand in player.active_hands():
                 self.settle_outcome(dealer, player, hand)
 
     def results(self):
         """Print player statistics"""
-        print()
+        self.say()
         players = sorted(self.players,
                          reverse=True,
                          key=lambda x: (x.chips,
@@ -417,13 +483,13 @@ class Game(object):
         for player in players:
             results = ",  ".join("{}: {:>2}".format(k, v) for k, v in player.results.items())
             prompt = "chips: {:>3},  {}".format(player.chips, results)
-            print(self.format_text(player.name, prompt, player.color))
+            self.say(player.name, prompt, player.color)
 
     def show_hand(self, name, hand, color="white"):
         """Print player's current hand"""
-        print()
+        self.say()
         prompt = "hand value {:>2} : {}".format(hand.value(), hand)
-        print(self.format_text(name, prompt, color))
+        self.announce(name, prompt, color)
 
     def play_hands(self):
         """Play any active hands until completed"""
@@ -442,7 +508,7 @@ class Game(object):
 
         while hand.active:
             if hand.twenty_one():
-                print(self.format_text(player.name, "scored 21! :)", player.color))
+                self.say(player.name, "scored 21! :)", player.color)
                 break
             if hand.bust():
                 self.bust(player, hand)
@@ -455,7 +521,9 @@ class Game(object):
                 answers = ('H', 'S')
 
             prompt = self.format_text(player.name, question, player.color)
+            self.ready()
             resp = get_response(prompt, answers, default='H')
+            hand.actions += resp
             if resp == 'H':
                 if self.hit(player, hand):
                     break
@@ -472,8 +540,12 @@ def clear_screen():
     """Clear the screen for better view"""
     print("\033[H\033[J")
 
-def continue_prompt():
+def continue_prompt(view=None):
     """Clear the screen before starting a new round"""
+    if view is not None:
+        view.prompt()
+        input("Hit enter to continue - ctrl-c to exit: ")
+        return
     print()
     input("Hit enter to continue - ctrl-c to exit: ")
     clear_screen()
@@ -510,8 +582,8 @@ def start_game():
         chips = int(chips)
     return Game(names, chips)
 
-def main():
-    """Run the main game loop"""
+def main(tui=False):
+    """Run the main game loop, optionally in the full-screen table view"""
     clear_screen()
     print("""
           Welcome to Blackjack!
@@ -545,12 +617,21 @@ and reports them at the conclusion.
 
     # collect names of the players and their starting chip balance
 
+    game = None
     try:
         print()
         game = start_game()
+        if tui:
+            from tui import TableView
+            columns, lines = shutil.get_terminal_size()
+            if TableView.fits(game, columns, lines):
+                # leave the last column free so a full row never wraps
+                game.view = TableView(game, columns - 1, size=shutil.get_terminal_size)
+            else:
+                print("The terminal is too small for the table view")
 
         while True:
-            continue_prompt()
+            continue_prompt(game.view)
             if not game.players_with_chips(10):
                 print("No one with any chips remaining - game over")
                 break
@@ -564,6 +645,9 @@ and reports them at the conclusion.
         print()
     finally:
         if game:
+            if game.view is not None:
+                game.view.close()
+                game.view = None
             game.results()
         print()
         print("Thanks for playing.")
@@ -571,4 +655,4 @@ and reports them at the conclusion.
 
 
 if __name__ == '__main__':
-    main()
+    main('--tui' in sys.argv[1:])
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Blackjack Simulation Cluster
+
+Spreads a simulation job over worker processes on any number of hosts.
+The coordinator splits the job's tables into chunks and leases them to
+workers over TCP, one JSON message per line. A chunk whose worker
+disconnects, or whose lease runs out, goes back to be leased again.
+Because every table is seeded from the job seed and its index, merging
+the chunk totals gives the same results as playing the job in one go.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import socket
+import socketserver
+import threading
+import time
+from collections import deque
+
+from simulation import merge, run_job
+
+WAIT = 0.5
+# totals a chunk's result must give, as in Simulation.summary()
+SUMMARY_KEYS = ('rounds', 'net', 'squares', 'wins', 'ties', 'losses')
+
+
+def whole(value):
+    """Is the value from a message an integer, and not a boolean?"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def send(stream, message):
+    """Write a message as a line of JSON"""
+    stream.write((json.dumps(message) + "\n").encode('utf-8'))
+    stream.flush()
+
+
+def receive(stream):
+    """Read a line of JSON, or None if the connection has closed"""
+    line = stream.readline()
+    if not line:
+        return None
+    return json.loads(line.decode('utf-8'))
+
+
+class Coordinator(object):
+    """Leases chunks of a job to workers and merges their results"""
+
+    def __init__(self, job, chunk=100, host='127.0.0.1', port=0, lease=600):
+        self.job = job
+        self.lease_time = lease
+        self.chunks = list((start, min(chunk, job['tables'] - start))
+                           for start in range(0, job['tables'], chunk))
+        self.pending = deque(range(len(self.chunks)))
+        self.leases = {}
+        self.results = {}
+        self.lock = threading.Condition()
+        coordinator = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            """Serves one worker connection"""
+
+            def handle(self):
+                coordinator.serve(self.rfile, self.wfile, self)
+
+        self.server = socketserver.ThreadingTCPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+
+    def lease(self, worker):
+        """Next chunk for the worker, None to wait, or False when done"""
+        with self.lock:
+            if len(self.results) == len(self.chunks):
+                return False
+            now = time.time()
+            for index, (deadline, _) in list(self.leases.items()):
+                if deadline < now:
+                    del self.leases[index]
+                    self.pending.append(index)
+            while self.pending:
+                index = self.pending.popleft()
+                if index not in self.results:
+                    self.leases[index] = (now + self.lease_time, worker)
+                    return index
+            return None
+
+    def complete(self, index, summary):
+        """Record the totals for a chunk, ignoring any duplicate"""
+        if (not whole(index) or not 0 <= index < len(self.chunks) or
+                not isinstance(summary, dict) or
+                not all(whole(summary.get(key)) for key in SUMMARY_KEYS)):
+            raise ValueError("bad result for chunk {!r}".format(index))
+        with self.lock:
+            self.leases.pop(index, None)
+            if index not in self.results:
+                self.results[index] = summary
+            self.lock.notify_all()
+
+    def release(self, worker):
+        """Return the chunks leased to a worker that has gone"""
+        with self.lock:
+            for index, (_, holder) in list(self.leases.items()):
+                if holder is worker:
+                    del self.leases[index]
+                    self.pending.append(index)
+
+    def serve(self, rfile, wfile, worker):
+        """Answer a worker's requests until it disconnects
+
+        A malformed message is treated as the worker disconnecting.
+        """
+        try:
+            while True:
+                message = receive(rfile)
+                if message is None:
+                    break
+                if message['op'] == 'result':
+                    self.complete(message['chunk'], message['summary'])
+                    continue
+                if message['op'] != 'lease':
+                    break
+                index = self.lease(worker)
+                if index is False:
+                    send(wfile, {'op': 'done'})
+                elif index is None:
+                    send(wfile, {'op': 'wait', 'seconds': WAIT})
+                else:
+                    start, count = self.chunks[index]
+                    send(wfile, {'op': 'chunk', 'chunk': index, 'job': self.job,
+                                 'start': start, 'count': count})
+        except (IOError, ValueError, KeyError, TypeError):
+            pass
+        finally:
+            self.release(worker)
+
+    def run(self):
+        """Serve workers until every chunk is complete, returning the totals"""
+        thread = threading.Thread(target=self.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            with self.lock:
+                while len(self.results) < len(self.chunks):
+                    self.lock.wait(WAIT)
+        finally:
+            self.server.shutdown()
+            self.server.server_close()
+        return merge(self.results[index] for index in range(len(self.chunks)))
+
+
+def work(host, port, retries=10):
+    """Run chunks leased from the coordinator until the job is done"""
+    for attempt in range(retries):
+        try:
+            connection = socket.create_connection((host, port))
+            break
+        except socket.error:
+            if attempt == retries - 1:
+                raise
+            time.sleep(WAIT)
+    stream = connection.makefile('rwb')
+    chunks = 0
+    try:
+        while True:
+            send(stream, {'op': 'lease'})
+            message = receive(stream)
+            if message is None or message['op'] == 'done':
+                break
+            if message['op'] == 'wait':
+                time.sleep(message['seconds'])
+                continue
+            summary = run_job(message['job'], message['start'], message['count'])
+            send(stream, {'op': 'result', 'chunk': message['chunk'], 'summary': summary})
+            chunks += 1
+    finally:
+        stream.close()
+        connection.close()
+    return chunks
+
+
+def main():
+    """Run a coordinator or a worker from the command line"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command')
+    coordinate = commands.add_parser('coordinate', help="split a job and merge results")
+    coordinate.add_argument('--host', default='0.0.0.0')
+    coordinate.add_argument('--port', type=int, default=5021)
+    coordinate.add_argument('--strategy', default='basic')
+    coordinate.add_argument('--rounds', type=int, required=True,
+                            help="total rounds to play")
+    coordinate.add_argument('--table-rounds', type=int, default=1000,
+                            help="rounds played at each table")
+    coordinate.add_argument('--seed', type=int, default=0)
+    coordinate.add_argument('--decks', type=int, default=1)
+    coordinate.add_argument('--bet', type=int, default=10)
+    coordinate.add_argument('--chunk', type=int, default=100,
+                            help="tables leased to a worker at a time")
+    worker = commands.add_parser('work', help="run chunks for a coordinator")
+    worker.add_argument('host')
+    worker.add_argument('--port', type=int, default=5021)
+    args = parser.parse_args()
+
+    if args.command == 'coordinate':
+        tables = -(-args.rounds // args.table_rounds)
+        job = {'strategy': args.strategy, 'seed': args.seed, 'rounds': args.table_rounds,
+               'tables': tables, 'decks': args.decks, 'bet': args.bet}
+        coordinator = Coordinator(job, args.chunk, args.host, args.port)
+        if tables * args.table_rounds != args.rounds:
+            print("playing {} rounds, a whole number of tables of {} rounds".format(
+                tables * args.table_rounds, args.table_rounds))
+        print("coordinating {} tables on {}:{}".format(tables, *coordinator.address))
+        totals = coordinator.run()
+        for key in sorted(totals):
+            print("{:>8}: {}".format(key, totals[key]))
+    elif args.command == 'work':
+        print("completed {} chunks".format(work(args.host, args.port)))
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
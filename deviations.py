@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Blackjack Strategy Deviations
+
+Finds the true count at which the best play for a decision departs from
+basic strategy. Every cell the game can offer - each two card total,
+soft total and pair against each dealer up card, plus insurance - is
+played out from shoes stacked to a range of true counts, once for each
+action, and the count where an action overtakes the basic strategy play
+becomes an index play that IndexStrategy can load.
+"""
+
+from __future__ import print_function
+
+import argparse
+import array
+import json
+import multiprocessing
+import os
+import pickle
+import random
+
+from blackjack import CARD_RANK, CARD_SUIT, Card, Deck
+from simulation import HILO, BasicStrategy, State, Table
+
+UPCARDS = ('2', '3', '4', '5', '6', '7', '8', '9', '10', 'A')
+HARD = dict((total, ('K', str(total - 10))) for total in range(12, 20))
+HARD.update({5: ('3', '2'), 6: ('4', '2'), 7: ('5', '2'), 8: ('6', '2'),
+             9: ('7', '2'), 10: ('6', '4'), 11: ('8', '3'), 20: ('K', 'Q')})
+SOFT = dict((total, ('A', str(total - 11))) for total in range(13, 21))
+PAIRS = ('2', '3', '4', '5', '6', '7', '8', '9', 'K', 'A')
+INSURANCE_HAND = ('K', '7')
+TRUE_COUNTS = range(-6, 7)
+# one card of each rank, shared by every stacked deck as only ranks matter
+CARDS = dict((rank, Card(rank, CARD_SUIT[0])) for rank in CARD_RANK)
+ATTEMPTS = 200
+
+
+def cells():
+    """Every decision cell as (first card, second card, up card, kind)"""
+    for up in UPCARDS:
+        for first, second in list(HARD.values()) + list(SOFT.values()):
+            yield first, second, up, 'hand'
+        for rank in PAIRS:
+            yield rank, rank, up, 'hand'
+    yield INSURANCE_HAND + ('A', 'insurance')
+
+
+def actions(cell):
+    """Actions to compare for a cell"""
+    first, second, _, kind = cell
+    if kind == 'insurance':
+        return ('I', 'N')
+    return ('S', 'H', 'D', 'P') if first == second else ('S', 'H', 'D')
+
+
+def describe(cell):
+    """The basic strategy state for a cell with no count"""
+    first, second, up, _ = cell
+    hand = list(Card(rank, CARD_SUIT[0]) for rank in (first, second))
+    total = sum(card.value() for card in hand)
+    soft = any(card.ace() for card in hand)
+    if total > 21:
+        total -= 10
+    return State(total, soft, first == second, True, Card(up, CARD_SUIT[0]).value(), 0)
+
+
+def shuffled_shoe(decks, cell, count, number, seed=0):
+    """Ranks of the shoe less the cell's cards, in the order of shuffle number"""
+    # pylint: disable=too-many-arguments
+    shoe = list(rank for _ in range(decks) for rank in CARD_RANK for _ in CARD_SUIT)
+    for rank in cell[:3]:
+        shoe.remove(rank)
+    random.Random("{}-{}-{}-{}".format(seed, "-".join(cell), count, number)).shuffle(shoe)
+    return shoe
+
+
+def burn_to_count(decks, shoe, count):
+    """Cards to burn from the top of the shoe to reach the true count, or None
+
+    At least a quarter of the shoe is kept.
+    """
+    # every card not left in the shoe has been seen, and a whole
+    # shoe counts to zero, so the running count is minus what is left
+    left = sum(HILO[rank] for rank in shoe)
+    for burned in range(len(shoe) - 13 * decks + 1):
+        if int(round(-left * 52.0 / (len(shoe) - burned))) == count:
+            return burned
+        left -= HILO[shoe[burned]]
+    return None
+
+
+def stacked_shoe(decks, cell, count, stacked, seed=0):
+    """Ranks of a stacked shoe from its packed shuffle number and burn"""
+    # pylint: disable=too-many-arguments
+    return shuffled_shoe(decks, cell, count, stacked >> 16, seed)[stacked & 0xffff:]
+
+
+def stack_shoes(decks, cell, count, wanted, stacked, seed=0):
+    """Add shoes at the true count to stacked until it holds wanted of them
+
+    Shoes are kept as the number of their shuffle and the cards burned
+    from it, packed into one integer, and recreated by stacked_shoe().
+    Shuffles carry on from the last one kept, and each shoe gets up to
+    ATTEMPTS of them to reach the count.
+    """
+    # pylint: disable=too-many-arguments
+    number = (stacked[-1] >> 16) + 1 if stacked else 0
+    for _ in range((wanted - len(stacked)) * ATTEMPTS):
+        if len(stacked) >= wanted:
+            break
+        burned = burn_to_count(decks, shuffled_shoe(decks, cell, count, number, seed), count)
+        if burned is not None:
+            stacked.append(number << 16 | burned)
+        number += 1
+    return stacked
+
+
+class ShoeLibrary(object):
+    """Stacked shoes kept per cell and count, optionally saved to disk
+
+    Each shoe is held as a packed shuffle number and burn, see stack_shoes().
+    The shuffles depend on the seed, so shoes are kept per seed as well.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.shoes = {}
+        if path and os.path.exists(path):
+            with open(path, 'rb') as library:
+                self.shoes = pickle.load(library)
+
+    def get(self, decks, seed, cell):
+        """Shoes already stacked for the cell from the seed, keyed by true count"""
+        return self.shoes.get((decks, seed, cell), {})
+
+    def add(self, decks, seed, cell, shoes):
+        """Keep shoes stacked for the cell from the seed"""
+        self.shoes.setdefault((decks, seed, cell), {}).update(shoes)
+
+    def save(self):
+        """Write the library to disk, if it has a path"""
+        if self.path:
+            with open(self.path, 'wb') as library:
+                pickle.dump(self.shoes, library, pickle.HIGHEST_PROTOCOL)
+
+
+class StackedDeck(Deck):
+    """Deck dealt in a given order, shuffling new decks once it runs out"""
+
+    def __init__(self, cards, rng=None, decks=1):
+        # pylint: disable=super-init-not-called
+        self.rng = rng or random
+        self.decks = decks
+        self.cards = cards
+
+
+def play_out(cell, shoe, action, decks=1):
+    """Net chips per unit bet from playing the cell with a forced first action
+
+    shoe holds the ranks left once the cell's cards are dealt, dealt from
+    the end as a Deck is.
+    """
+    first, second, up, _ = cell
+    dealt = (second, up, first)
+    cards = list(CARDS[rank] for rank in shoe)
+    cards.extend(CARDS[rank] for rank in dealt)
+    table = Table(0, 1, chips=10 ** 6,
+                  shoe=StackedDeck(cards, random.Random(0), decks))
+    table.running = -sum(HILO[rank] for rank in shoe) - sum(HILO[rank] for rank in dealt)
+    game = table.play()
+    forced = True
+    try:
+        kind, state = next(game)
+        while True:
+            if kind == 'I':
+                answer = action == 'I'
+            elif forced and action not in ('I', 'N'):
+                answer = action
+                forced = False
+            else:
+                answer = BasicStrategy.action(state)
+            kind, state = game.send(answer)
+    except StopIteration:
+        pass
+    return table.net / float(table.bet)
+
+
+def evaluate(task):
+    """Expected value of each action at each count for one cell
+
+    Returns the cell, a dict of action to {count: value} and the shoes
+    stacked for it, so the parent can keep them in the library.
+    """
+    cell, decks, counts, shoes, seed, stacked = task
+    values = dict((action, {}) for action in actions(cell))
+    for count in counts:
+        library = stack_shoes(decks, cell, count, shoes,
+                              stacked.setdefault(count, array.array('Q')), seed)
+        played = list(stacked_shoe(decks, cell, count, packed, seed)
+                      for packed in library[:shoes])
+        for action in values:
+            if played:
+                values[action][count] = sum(play_out(cell, shoe, action, decks)
+                                            for shoe in played) / len(played)
+    return cell, values, stacked
+
+
+def crossing(differences):
+    """Count where a linear fit of the differences crosses zero, with its direction"""
+    points = sorted(differences.items())
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / float(len(points))
+    mean_y = sum(y for _, y in points) / float(len(points))
+    slope = (sum((x - mean_x) * (y - mean_y) for x, y in points) /
+             sum((x - mean_x) ** 2 for x, _ in points))
+    if slope == 0:
+        return None
+    index = int(round(mean_x - mean_y / slope))
+    if not points[0][0] <= index <= points[-1][0]:
+        return None
+    return index, 1 if slope > 0 else -1
+
+
+def index_plays(cell, values):
+    """Index plays for a cell from the value of each action at each count"""
+    state = describe(cell)
+    best = 'N' if cell[3] == 'insurance' else BasicStrategy.action(state)
+    plays = []
+    for action, by_count in values.items():
+        if action in (best, 'N'):
+            continue
+        found = crossing(dict((count, value - values[best][count])
+                              for count, value in by_count.items()))
+        if found is None:
+            continue
+        play = {'action': action, 'upcard': state.upcard,
+                'index': found[0], 'direction': found[1]}
+        if action != 'I':
+            play.update(total=state.total, soft=state.soft, pair=state.pair)
+        plays.append(play)
+    return plays
+
+
+def generate(decks=1, counts=TRUE_COUNTS, shoes=100, processes=None, library=None,
+             seed=0, only=None):
+    """Index plays for every cell, or just the cells in only"""
+    # pylint: disable=too-many-arguments
+    library = library or ShoeLibrary()
+    tasks = list((cell, decks, list(counts), shoes, seed, dict(library.get(decks, seed, cell)))
+                 for cell in (only or cells()))
+    pool = multiprocessing.Pool(processes)
+    plays = []
+    try:
+        for cell, values, stacked in pool.imap_unordered(evaluate, tasks):
+            library.add(decks, seed, cell, stacked)
+            plays.extend(index_plays(cell, values))
+    finally:
+        pool.close()
+        pool.join()
+    library.save()
+    plays.sort(key=lambda play: (play['action'] == 'I', play.get('soft'), play.get('pair'),
+                                 play.get('total'), play['upcard']))
+    return plays
+
+
+def main():
+    """Generate an index play table and write it as JSON"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('output', help="JSON file to write the index plays to")
+    parser.add_argument('--decks', type=int, default=1)
+    parser.add_argument('--shoes', type=int, default=2000,
+                        help="shoes played per cell and count")
+    parser.add_argument('--low', type=int, default=-6, help="lowest true count")
+    parser.add_argument('--high', type=int, default=6, help="highest true count")
+    parser.add_argument('--library', help="file to keep stacked shoes in")
+    parser.add_argument('--processes', type=int, help="worker processes")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    plays = generate(args.decks, range(args.low, args.high + 1), args.shoes,
+                     args.processes, ShoeLibrary(args.library), args.seed)
+    with open(args.output, 'w') as output:
+        json.dump(plays, output, indent=1)
+    print("{} index plays written to {}".format(len(plays), args.output))
+
+
+if __name__ == '__main__':
+    main()
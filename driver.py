@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Blackjack Scripted Driver
+
+Plays the interactive game from a script of answers instead of the
+keyboard. The deal delay is switched off, everything the game prints is
+captured, and the time the game spends between prompts and per round is
+measured so the human-facing path can be load and regression tested.
+"""
+
+from __future__ import print_function
+
+import argparse
+import io
+import random
+import sys
+import time
+
+import blackjack
+
+ROUND_PROMPT = "Hit enter to continue"
+
+
+class ScriptedInput(object):
+    """Stands in for input(), answering prompts from a script"""
+
+    def __init__(self, answers, output, clock=time.perf_counter):
+        self.answers = iter(answers)
+        self.output = output
+        self.clock = clock
+        self.prompts = []
+        self.rounds = []
+        self.last = self.round_start = clock()
+
+    def __call__(self, prompt=''):
+        now = self.clock()
+        self.prompts.append((prompt, now - self.last))
+        if prompt.startswith(ROUND_PROMPT):
+            if self.prompts[:-1]:
+                self.rounds.append(now - self.round_start)
+            self.round_start = now
+        self.output.write(prompt)
+        try:
+            answer = next(self.answers)
+        except StopIteration:
+            raise KeyboardInterrupt
+        self.output.write(answer + "\n")
+        self.last = self.clock()
+        return answer
+
+
+def run(answers, seed=None, target=None):
+    """Run the game with scripted answers, returning the ScriptedInput
+
+    The captured transcript is left in its 'transcript' attribute. The
+    game ends, showing results, once the script runs out.
+    """
+    if seed is not None:
+        random.seed(seed)
+    output = io.StringIO()
+    script = ScriptedInput(answers, output)
+    saved = blackjack.input, blackjack.DEAL_DELAY, sys.stdout
+    blackjack.input, blackjack.DEAL_DELAY, sys.stdout = script, 0, output
+    try:
+        (target or blackjack.main)()
+    finally:
+        blackjack.input, blackjack.DEAL_DELAY, sys.stdout = saved
+    script.transcript = output.getvalue()
+    return script
+
+
+def percentiles(timings):
+    """Summarise a list of timings in milliseconds"""
+    if not timings:
+        return "none"
+    timings = sorted(timings)
+    pick = lambda p: timings[min(int(p * len(timings)), len(timings) - 1)] * 1000
+    return "n={} mean={:.3f}ms p50={:.3f}ms p99={:.3f}ms max={:.3f}ms".format(
+        len(timings), sum(timings) * 1000 / len(timings),
+        pick(0.5), pick(0.99), timings[-1] * 1000)
+
+
+def main():
+    """Replay a script of answers and report latency"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('script', help="file of answers, one per line")
+    parser.add_argument('-n', '--repeat', type=int, default=1,
+                        help="number of times to play the script")
+    parser.add_argument('-s', '--seed', type=int, help="random seed")
+    parser.add_argument('-o', '--output', help="write the last transcript here")
+    args = parser.parse_args()
+
+    with io.open(args.script, encoding='utf-8') as script:
+        answers = script.read().splitlines()
+    prompts, rounds = [], []
+    for _ in range(args.repeat):
+        result = run(answers, args.seed)
+        prompts.extend(t for _, t in result.prompts)
+        rounds.extend(result.rounds)
+    if args.output:
+        with io.open(args.output, 'w', encoding='utf-8') as output:
+            output.write(result.transcript)
+    print("per prompt: {}".format(percentiles(prompts)))
+    print("per round:  {}".format(percentiles(rounds)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,386 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Blackjack Hand History
+
+Columnar, append-only store of per-hand records. Each column is held in
+a flat typed array while the round is played, flushed to disk as a
+zlib compressed chunk once full, and read back as whole columns.
+"""
+
+import array
+import glob
+import json
+import os
+import struct
+import sys
+import zlib
+from itertools import accumulate, chain
+
+from blackjack import CARD_RANK, CARD_SUIT, Card
+
+RANK_INDEX = dict((rank, index) for index, rank in enumerate(CARD_RANK))
+VALUES = dict((rank, Card(rank, CARD_SUIT[0]).value()) for rank in CARD_RANK)
+ACTION_CODES = {'': 0, 'H': 1, 'S': 2, 'D': 3, 'P': 4}
+CHUNK_MAGIC = b"BJH1"
+CHUNK_NAME = "chunk-{:06d}.bjh"
+INDEX_MAGIC = b"BJI1"
+INDEX_NAME = "index-{:06d}.bji"
+INDEX_SUMMARY = "index-summary.json"
+COLUMNS = (
+    ('round', 'Q'),     # round number within the game
+    ('player', 'I'),    # index into the names table
+    ('first', 'B'),     # index into CARD_RANK of the first card dealt
+    ('second', 'B'),    # index into CARD_RANK of the second card dealt
+    ('upcard', 'B'),    # index into CARD_RANK of the dealer face up card
+    ('actions', 'B'),   # number of action codes held in the action stream
+    ('total', 'B'),     # final value of the player's hand
+    ('dealer', 'B'),    # value of the dealer's hand when settled
+    ('payout', 'i'),    # net chips won (+) or lost (-) on the hand
+)
+
+
+def _encode(column):
+    """Little-endian bytes of a typed array, compressed"""
+    if sys.byteorder == 'big':
+        column = array.array(column.typecode, column)
+        column.byteswap()
+    return zlib.compress(column.tobytes())
+
+
+def _decode(typecode, data):
+    """Typed array from compressed little-endian bytes"""
+    column = array.array(typecode)
+    column.frombytes(zlib.decompress(data))
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+
+class HandHistory(object):
+    """Append-only columnar store of settled hands, flushed in chunks
+
+    With index set, a HistoryIndex of decision situations is kept in the
+    same directory and updated as each hand is appended. Chunks written
+    before the index existed are indexed when it is created, and an index
+    that does not cover the rows already written is an error.
+    """
+
+    def __init__(self, path, chunk_size=65536, index=False):
+        assert chunk_size > 0
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.path = path
+        self.chunk_size = chunk_size
+        existing = sorted(glob.glob(os.path.join(path, "chunk-*.bjh")))
+        self.chunks = len(existing)
+        # carry on the names table of the last session, so ids keep their meaning
+        self.names = []
+        for filename in existing:
+            self.names = chunk_names(self.names, read_header(filename))
+        self.name_ids = dict((name, index) for index, name in enumerate(self.names))
+        self.names_written = len(self.names)
+        self.columns = dict((name, array.array(code)) for name, code in COLUMNS)
+        self.action_stream = array.array('B')
+        self.rows = 0
+        self.index = None
+        if index:
+            self.index = HistoryIndex(path)
+            if not self.index.rows and not self.index.segments:
+                self.index.add_chunks(existing)
+            written = sum(read_header(filename)['rows'] for filename in existing)
+            if self.index.rows != written:
+                raise ValueError("index of {} covers {} rows but it holds {}".format(
+                    path, self.index.rows, written))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def player_id(self, name):
+        """Index of the player's name in the names table"""
+        try:
+            return self.name_ids[name]
+        except KeyError:
+            self.name_ids[name] = len(self.names)
+            self.names.append(name)
+            return self.name_ids[name]
+
+    def append(self, round, name, first, second, upcard, actions, total, dealer, payout):
+        """Record one settled hand; cards are given by rank, actions as a string"""
+        # pylint: disable=redefined-builtin,too-many-arguments
+        columns = self.columns
+        columns['round'].append(round)
+        columns['player'].append(self.player_id(name))
+        columns['first'].append(RANK_INDEX[first])
+        columns['second'].append(RANK_INDEX[second])
+        columns['upcard'].append(RANK_INDEX[upcard])
+        columns['actions'].append(len(actions))
+        columns['total'].append(total)
+        columns['dealer'].append(dealer)
+        columns['payout'].append(payout)
+        self.action_stream.frombytes(actions.encode('ascii'))
+        if self.index is not None:
+            self.index.add(first, second, upcard, actions, payout)
+        self.rows += 1
+        if self.rows >= self.chunk_size:
+            self.flush()
+
+    def flush(self):
+        """Write any buffered rows to the next chunk file"""
+        if not self.rows:
+            return
+        header = {'rows': self.rows, 'name_base': self.names_written,
+                  'names': self.names[self.names_written:], 'columns': []}
+        bodies = []
+        for name, code in COLUMNS + (('action_stream', 'B'),):
+            column = self.action_stream if name == 'action_stream' else self.columns[name]
+            body = _encode(column)
+            header['columns'].append([name, code, len(body)])
+            bodies.append(body)
+            del column[:]
+        header = json.dumps(header).encode('utf-8')
+        filename = os.path.join(self.path, CHUNK_NAME.format(self.chunks))
+        with open(filename, 'wb') as chunk:
+            chunk.write(CHUNK_MAGIC)
+            chunk.write(struct.pack('<I', len(header)))
+            chunk.write(header)
+            for body in bodies:
+                chunk.write(body)
+        self.chunks += 1
+        self.rows = 0
+        self.names_written = len(self.names)
+        if self.index is not None:
+            self.index.flush()
+
+    def close(self):
+        """Flush the remaining rows"""
+        self.flush()
+
+
+def situation(first, second, actions):
+    """Total, soft and pair flags and action of a hand's first decision
+
+    A split hand's second card was dealt after the split, so its first
+    decision is taken to be the pair of its first card.
+    """
+    action = actions[:1]
+    if action == 'P':
+        second = first
+    total = VALUES[first] + VALUES[second]
+    soft = 'A' in (first, second)
+    if total > 21:
+        total -= 10
+    return total, soft, first == second, action
+
+
+def situation_key(total, soft, pair, upcard, action):
+    """Pack a decision situation into a single integer"""
+    # pylint: disable=too-many-arguments
+    return (((total * 2 + soft) * 2 + pair) * 16 + upcard) * 8 + ACTION_CODES[action]
+
+
+class HistoryIndex(object):
+    """Postings and running totals of recorded hands by decision situation
+
+    A situation is the player's two card total, whether it is soft or a
+    pair, the value of the dealer's face up card and the first action
+    taken. Totals for every situation are kept in memory and rewritten to
+    a small summary file on each flush, so summary() never touches the
+    history. The row numbers of each flush are written as a compressed,
+    delta encoded postings segment, one run of postings per situation.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.summary_file = os.path.join(path, INDEX_SUMMARY)
+        self.totals = {}
+        self.rows = 0
+        self.segments = 0
+        if os.path.exists(self.summary_file):
+            with open(self.summary_file) as summary:
+                saved = json.load(summary)
+            self.rows = saved['rows']
+            self.segments = saved['segments']
+            self.totals = dict((int(key), value) for key, value in saved['totals'].items())
+        self.postings = {}
+
+    def add(self, first, second, upcard, actions, payout):
+        """Index the next row of the history"""
+        # pylint: disable=too-many-arguments
+        total, soft, pair, action = situation(first, second, actions)
+        key = situation_key(total, soft, pair, VALUES[upcard], action)
+        totals = self.totals.get(key)
+        if totals is None:
+            totals = self.totals[key] = [0, 0, 0, 0, 0]
+        totals[0] += 1
+        totals[1 if payout > 0 else 2 if payout == 0 else 3] += 1
+        totals[4] += payout
+        postings = self.postings.get(key)
+        if postings is None:
+            postings = self.postings[key] = array.array('Q')
+        postings.append(self.rows)
+        self.rows += 1
+
+    def add_chunks(self, filenames):
+        """Index every row of the given chunk files, flushing after each"""
+        for filename in filenames:
+            _, columns = read_chunk(filename)
+            stream = columns['action_stream'].tobytes().decode('ascii')
+            start = 0
+            for row, count in enumerate(columns['actions']):
+                first, second, upcard = (CARD_RANK[columns[name][row]]
+                                         for name in ('first', 'second', 'upcard'))
+                self.add(first, second, upcard, stream[start:start + count],
+                         columns['payout'][row])
+                start += count
+            self.flush()
+
+    def flush(self):
+        """Write the postings since the last flush and the running totals"""
+        if self.postings:
+            header, bodies = [], []
+            for key in sorted(self.postings):
+                postings = self.postings[key]
+                deltas = array.array('I', (b - a for a, b in zip(postings, postings[1:])))
+                body = _encode(deltas)
+                header.append([key, postings[0], len(postings), len(body)])
+                bodies.append(body)
+            header = json.dumps(header).encode('utf-8')
+            filename = os.path.join(self.path, INDEX_NAME.format(self.segments))
+            with open(filename, 'wb') as segment:
+                segment.write(INDEX_MAGIC)
+                segment.write(struct.pack('<I', len(header)))
+                segment.write(header)
+                for body in bodies:
+                    segment.write(body)
+            self.segments += 1
+            self.postings = {}
+        with open(self.summary_file, 'w') as summary:
+            json.dump({'rows': self.rows, 'segments': self.segments,
+                       'totals': self.totals}, summary)
+
+    def keys(self, total, upcard, soft, pair, action):
+        """Situation keys matching a query, for any action if action is None"""
+        # pylint: disable=too-many-arguments
+        upcard = VALUES.get(upcard, upcard)
+        actions = ACTION_CODES if action is None else (action,)
+        return list(situation_key(total, soft, pair, upcard, a) for a in actions)
+
+    def summary(self, total, upcard, soft=False, pair=False, action=None):
+        """Hands, wins, ties, losses and net chips for a situation
+
+        upcard is the dealer card's value (Ace is 11) or its rank, and
+        action is the first action taken ('H', 'S', 'D', 'P' or '' when
+        there was no decision), or None for any action.
+        """
+        # pylint: disable=too-many-arguments
+        result = dict((name, 0) for name in ('hands', 'wins', 'ties', 'losses', 'chips'))
+        for key in self.keys(total, upcard, soft, pair, action):
+            for name, value in zip(('hands', 'wins', 'ties', 'losses', 'chips'),
+                                   self.totals.get(key, ())):
+                result[name] += value
+        return result
+
+    def rows_for(self, total, upcard, soft=False, pair=False, action=None):
+        """History row numbers for a situation, in order"""
+        # pylint: disable=too-many-arguments
+        keys = set(self.keys(total, upcard, soft, pair, action))
+        rows = array.array('Q')
+        for number in range(self.segments):
+            filename = os.path.join(self.path, INDEX_NAME.format(number))
+            with open(filename, 'rb') as segment:
+                assert segment.read(4) == INDEX_MAGIC
+                header = _header(segment)
+                runs = []
+                for key, base, count, length in header:
+                    if key in keys:
+                        runs.append((base, _decode('I', segment.read(length))))
+                    else:
+                        segment.seek(length, os.SEEK_CUR)
+            for base, deltas in runs:
+                rows.extend(accumulate(chain((base,), deltas)))
+        for key in keys:
+            rows.extend(self.postings.get(key, ()))
+        return array.array('Q', sorted(rows))
+
+
+def _header(stream):
+    """Read the JSON header following a chunk's magic number"""
+    size, = struct.unpack('<I', stream.read(4))
+    return json.loads(stream.read(size).decode('utf-8'))
+
+
+def chunk_names(names, header):
+    """The names table of a chunk, given that of the chunk before it
+
+    A chunk only holds the names added since the one before, starting at
+    id 'name_base'; older chunks hold the whole table.
+    """
+    return names[:header.get('name_base', 0)] + header['names']
+
+
+def read_header(filename):
+    """Read just the header of a chunk file"""
+    with open(filename, 'rb') as chunk:
+        assert chunk.read(4) == CHUNK_MAGIC
+        return _header(chunk)
+
+
+def read_chunk(filename):
+    """Read a single chunk file, returning its header and columns"""
+    with open(filename, 'rb') as chunk:
+        assert chunk.read(4) == CHUNK_MAGIC
+        header = _header(chunk)
+        columns = {}
+        for name, code, length in header['columns']:
+            columns[name] = _decode(code, chunk.read(length))
+    return header, columns
+
+
+def load(path):
+    """Load every chunk under path as whole columns
+
+    Returns a dict of typed arrays keyed by column name, plus 'names'
+    (the player names table) and 'offsets' (start of each row's actions
+    within 'action_stream'). Player ids are mapped from each chunk's own
+    names table onto the combined one. The arrays support the buffer protocol so
+    can be wrapped without copying, e.g. numpy.frombuffer(cols['payout'],
+    dtype='<i4').
+    """
+    result = dict((name, array.array(code)) for name, code in COLUMNS)
+    result['action_stream'] = array.array('B')
+    names = result['names'] = []
+    name_ids = {}
+    # combined id of each id in the current chunk's table, and the first
+    # id that differs, if any
+    ids = []
+    moved = None
+    for filename in sorted(glob.glob(os.path.join(path, "chunk-*.bjh"))):
+        header, columns = read_chunk(filename)
+        del ids[header.get('name_base', 0):]
+        if moved is not None and moved >= len(ids):
+            moved = None
+        for name in header['names']:
+            if name not in name_ids:
+                name_ids[name] = len(names)
+                names.append(name)
+            if moved is None and name_ids[name] != len(ids):
+                moved = len(ids)
+            ids.append(name_ids[name])
+        if moved is not None:
+            columns['player'] = array.array('I', (ids[p] for p in columns['player']))
+        for name, column in columns.items():
+            if column.typecode != result[name].typecode:
+                column = array.array(result[name].typecode, column)
+            result[name].extend(column)
+    result['offsets'] = array.array('Q', accumulate(chain((0,), result['actions'])))
+    return result
+
+
+def actions(columns, row):
+    """Action string recorded for the given row of loaded columns"""
+    start, end = columns['offsets'][row], columns['offsets'][row + 1]
+    return columns['action_stream'][start:end].tobytes().decode('ascii')
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Blackjack Simulation Scheduler
+
+Runs a batch of simulation jobs over a pool of worker processes, in
+increments of a few tables at a time. Each free worker is handed the job
+whose house edge is still least certain, so jobs that have converged
+stop using CPU. Scheduling ends once every job's confidence interval is
+within the target, or the CPU budget has been spent.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import math
+import multiprocessing
+import queue
+import time
+
+from simulation import MIN_BET, merge, run_job
+
+
+def house_edge(totals, bet, z=1.96):
+    """House edge per unit bet and the half width of its interval"""
+    rounds = totals.get('rounds', 0)
+    if rounds < 2:
+        return 0.0, float('inf')
+    mean = totals['net'] / float(rounds)
+    variance = (totals['squares'] - rounds * mean * mean) / (rounds - 1)
+    return -mean / bet, z * math.sqrt(max(variance, 0) / rounds) / bet
+
+
+def increment(job, start, count):
+    """Play an increment of a job, returning its totals and CPU seconds"""
+    began = time.process_time()
+    totals = run_job(job, start, count)
+    return totals, time.process_time() - began
+
+
+class Progress(object):
+    """What is known so far about one job, played tables at a time"""
+
+    def __init__(self, job, z, tables=1):
+        self.job = job
+        self.z = z
+        self.increment = tables
+        self.totals = {}
+        self.tables = 0
+        self.running = 0
+
+    def edge(self):
+        """House edge and interval half width from the rounds completed"""
+        return house_edge(self.totals, self.job.get('bet', MIN_BET), self.z)
+
+    def projected(self):
+        """Half width expected once the running increments complete"""
+        width = self.edge()[1]
+        done = self.totals.get('rounds', 0)
+        if not done:
+            return width
+        running = self.running * self.increment * self.job['rounds']
+        return width * math.sqrt(done / float(done + running))
+
+
+def next_job(progress, target):
+    """Name of the job most in need of rounds, or None if all are precise"""
+    waiting = list((p.projected(), -p.running, name) for name, p in progress.items()
+                   if p.projected() > target)
+    if not waiting:
+        return None
+    return max(waiting)[2]
+
+
+def schedule(jobs, target, budget, tables=20, processes=None, z=1.96):
+    """Run jobs until each edge is within target or budget CPU seconds are spent
+
+    jobs maps a name to a job as run by simulation.run_job (its 'tables'
+    entry is ignored); each increment plays the next tables of the job.
+    Returns, for each name, the edge, the interval half width, the rounds
+    played and the totals.
+    """
+    # pylint: disable=too-many-arguments,too-many-locals
+    progress = dict((name, Progress(job, z, tables)) for name, job in jobs.items())
+    workers = processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(workers)
+    finished = queue.Queue()
+    spent = 0.0
+    running = 0
+    try:
+        while True:
+            while running < workers and spent < budget:
+                name = next_job(progress, target)
+                if name is None:
+                    break
+                job = progress[name]
+                pool.apply_async(increment, (job.job, job.tables, tables),
+                                 callback=lambda result, name=name: finished.put((name, result)),
+                                 error_callback=lambda error: finished.put((None, error)))
+                job.tables += tables
+                job.running += 1
+                running += 1
+            if not running:
+                break
+            name, result = finished.get()
+            if name is None:
+                raise result
+            totals, seconds = result
+            job = progress[name]
+            job.totals = merge((job.totals, totals))
+            job.running -= 1
+            running -= 1
+            spent += seconds
+    finally:
+        pool.terminate()
+        pool.join()
+    report = {}
+    for name, job in progress.items():
+        edge, width = job.edge()
+        report[name] = {'edge': edge, 'width': width, 'rounds': job.totals.get('rounds', 0),
+                        'converged': width <= target, 'totals': job.totals}
+    return report
+
+
+def main():
+    """Schedule the jobs in a JSON file and print their house edges"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('jobs', help="JSON file mapping names to jobs")
+    parser.add_argument('--target', type=float, default=0.005,
+                        help="interval half width to reach, per unit bet")
+    parser.add_argument('--budget', type=float, default=600,
+                        help="CPU seconds to spend across all workers")
+    parser.add_argument('--tables', type=int, default=20,
+                        help="tables played per increment")
+    parser.add_argument('--processes', type=int, help="worker processes")
+    args = parser.parse_args()
+
+    with open(args.jobs) as jobs:
+        jobs = json.load(jobs)
+    report = schedule(jobs, args.target, args.budget, args.tables, args.processes)
+    for name in sorted(report):
+        entry = report[name]
+        print("{:>20}: edge {:+.4f} ± {:.4f}  rounds {:>10}{}".format(
+            name, entry['edge'], entry['width'], entry['rounds'],
+            "" if entry['converged'] else "  (not converged)"))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,427 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Blackjack Simulation
+
+Plays many tables at once with no user interaction, following the same
+rules as the interactive game. Each table suspends whenever its player
+has a decision to make; the decisions pending across every table are
+then handed to the strategy as a single batch and the tables resume
+with the actions it returns.
+"""
+
+import json
+import math
+import random
+from collections import namedtuple
+from functools import partial
+
+from blackjack import Deck, Hand, Player
+
+MIN_BET = 10
+HILO = {'A': -1, 'K': -1, 'Q': -1, 'J': -1, '10': -1,
+        '9': 0, '8': 0, '7': 0,
+        '6': 1, '5': 1, '4': 1, '3': 1, '2': 1}
+
+# A pending decision: the player's hand total, whether it is soft, whether
+# the pair may be split, whether doubling down is allowed, the value of
+# the dealer's face up card (Ace is 11) and the Hi-Lo true count
+State = namedtuple('State', 'total soft pair can_double upcard count')
+
+
+class Strategy(object):
+    """Decides actions for a batch of pending states
+
+    Subclasses override decide() and may override insure(); both receive
+    a list of State and must return a list of answers in the same order.
+    """
+
+    def decide(self, states):
+        """Return 'H', 'S', 'D' or 'P' for each state"""
+        raise NotImplementedError
+
+    def insure(self, states):
+        """Return True for each state where insurance should be taken"""
+        return [False] * len(states)
+
+
+class BasicStrategy(Strategy):
+    """Standard basic strategy, ignoring the count"""
+
+    def decide(self, states):
+        return list(self.action(state) for state in states)
+
+    @staticmethod
+    def action(state):
+        """Basic strategy action for a single state"""
+        total, up = state.total, state.upcard
+        if state.pair:
+            if state.soft or total == 16:
+                return 'P'
+            if (total == 18 and up not in (7, 10, 11) or
+                    total == 14 and up <= 7 or
+                    total == 12 and up <= 6 or
+                    total == 8 and up in (5, 6) or
+                    total in (4, 6) and up <= 7):
+                return 'P'
+        double = 'D' if state.can_double else 'H'
+        if state.soft:
+            if total >= 19:
+                return 'S'
+            if total == 18:
+                if 3 <= up <= 6:
+                    return 'D' if state.can_double else 'S'
+                return 'S' if up in (2, 7, 8) else 'H'
+            if (total == 17 and 3 <= up <= 6 or
+                    total in (15, 16) and 4 <= up <= 6 or
+                    total in (13, 14) and 5 <= up <= 6):
+                return double
+            return 'H'
+        if total >= 17:
+            return 'S'
+        if total >= 13:
+            return 'S' if up <= 6 else 'H'
+        if total == 12:
+            return 'S' if 4 <= up <= 6 else 'H'
+        if (total == 11 and up <= 10 or
+                total == 10 and up <= 9 or
+                total == 9 and 3 <= up <= 6):
+            return double
+        return 'H'
+
+
+class IndexStrategy(BasicStrategy):
+    """Basic strategy with count-indexed deviations
+
+    Each index play names the cell it applies to (total, soft, pair and
+    up card), the action to take instead of basic strategy, the true
+    count index and a direction: 1 to deviate at or above the index, -1
+    at or below it. An 'I' play with an up card of 11 takes insurance.
+    """
+
+    def __init__(self, plays):
+        self.plays = {}
+        self.insurance = []
+        for play in plays:
+            if play['action'] == 'I':
+                self.insurance.append(play)
+            else:
+                cell = (play['total'], play['soft'], play['pair'], play['upcard'])
+                self.plays.setdefault(cell, []).append(play)
+        for cell_plays in self.plays.values():
+            cell_plays.sort(key=lambda play: abs(play['index']))
+
+    @classmethod
+    def load(cls, path):
+        """Read index plays from a JSON file"""
+        with open(path) as plays:
+            return cls(json.load(plays))
+
+    @staticmethod
+    def applies(play, count):
+        """Has the count reached the play's index?"""
+        return (count - play['index']) * play['direction'] >= 0
+
+    def action(self, state):
+        cell = (state.total, state.soft, state.pair, state.upcard)
+        for play in self.plays.get(cell, ()):
+            if play['action'] == 'D' and not state.can_double:
+                continue
+            if self.applies(play, state.count):
+                return play['action']
+        return BasicStrategy.action(state)
+
+    def insure(self, states):
+        return list(any(self.applies(play, state.count) for play in self.insurance)
+                    for state in states)
+
+
+STRATEGIES = {'basic': BasicStrategy}
+
+
+def settle(player, hand, dealer):
+    """Settle the hand against the dealer and return the net payout"""
+    hand.active = False
+    if hand.value() > dealer.value() or dealer.bust():
+        odds = 1.5 if hand.blackjack() else 1
+        player.win(hand.stake, odds)
+        return int(hand.stake * (odds + 1)) - hand.stake
+    if hand.value() == dealer.value():
+        player.push(hand.stake)
+        return 0
+    player.loss()
+    return -hand.stake
+
+
+class Table(object):
+    """A single player against the dealer, with its own seeded deck
+
+    The deck is dealt continuously across rounds unless shoe_rounds is
+    set, in which case a new shoe, shuffled from the seed and shoe number,
+    starts every shoe_rounds rounds. Each shoe then starts with the same
+    cards however many were drawn from the shoes before it. A prepared
+    shoe may be given to deal from instead of a newly shuffled deck.
+    """
+
+    def __init__(self, seed, rounds, chips=None, bet=MIN_BET, history=None, deck=Deck,
+                 shoe_rounds=None, shoe=None):
+        # pylint: disable=too-many-arguments
+        self.seed = seed
+        self.new_deck = deck
+        self.shoe_rounds = shoe_rounds
+        if shoe is None:
+            shoe = deck(random.Random(seed))
+            shoe.shuffle()
+        self.deck = shoe
+        self.player = Player("table-{}".format(seed), chips or rounds * bet * 10)
+        self.rounds = rounds
+        self.bet = bet
+        self.history = history
+        self.running = 0
+        self.round = 0
+        self.dealer = None
+        self.game = None
+        self.net = 0
+        self.squares = 0
+
+    def deal(self, hand, seen=True):
+        """Deal the next card to the hand, counting it if it is seen"""
+        if not self.deck.cards:
+            self.running = 0
+        card = self.deck.deal()
+        if seen:
+            self.running += HILO[card.rank]
+        hand.add_card(card)
+
+    def reveal(self):
+        """Turn over the dealer's hole card, adding it to the count"""
+        self.running += HILO[self.dealer.last().rank]
+
+    def true_count(self):
+        """Running count per deck remaining, rounded to the nearest integer"""
+        decks = max(len(self.deck.cards), 1) / 52.0
+        return int(round(self.running / decks))
+
+    def state(self, hand, pair=False, can_double=False):
+        """Describe the decision facing the player's hand"""
+        return State(hand.value(), hand.soft(), pair, can_double,
+                     self.dealer.first().value(), self.true_count())
+
+    def record(self, hand, payout):
+        """Append the settled hand to the hand history, if one is kept"""
+        if self.history is not None:
+            self.history.append(self.round, self.player.name,
+                                hand.cards[0].rank, hand.cards[1].rank,
+                                self.dealer.first().rank, hand.actions,
+                                hand.value(), self.dealer.value(), payout)
+
+    def settle(self, hand):
+        """Settle the hand against the dealer and record it"""
+        self.record(hand, settle(self.player, hand, self.dealer))
+
+    def bust(self, hand):
+        """Handle a player's hand that has busted"""
+        self.player.loss()
+        hand.active = False
+        self.record(hand, -hand.stake)
+
+    def play(self):
+        """Generator playing every round, yielding each decision needed
+
+        Yields ('I', state) when insurance is offered, expecting True or
+        False to be sent back, and ('A', state) for every other decision,
+        expecting 'H', 'S', 'D' or 'P'.
+        """
+        player = self.player
+        for _ in range(self.rounds):
+            if not player.has_chips(self.bet):
+                return
+            chips = player.chips
+            self.round += 1
+            if self.shoe_rounds and (self.round - 1) % self.shoe_rounds == 0:
+                number = (self.round - 1) // self.shoe_rounds
+                self.deck = self.new_deck(random.Random("{}-{}".format(self.seed, number)))
+                self.deck.shuffle()
+                self.running = 0
+            hand = Hand(player.bet(self.bet))
+            player.hands = [hand]
+            player.insurance = 0
+            dealer = self.dealer = Hand(0)
+            self.deal(hand)
+            self.deal(dealer)
+            self.deal(hand)
+            self.deal(dealer, seen=False)
+
+            if dealer.first().ace() and player.has_chips(self.bet // 2):
+                insure = yield ('I', self.state(hand))
+                if insure:
+                    player.insurance = player.bet(self.bet // 2)
+            if dealer.blackjack():
+                self.reveal()
+                if player.insurance:
+                    player.win(player.insurance, odds=2)
+                self.settle(hand)
+            else:
+                if player.insurance:
+                    player.loss()
+                if hand.blackjack():
+                    self.settle(hand)
+                for hand in player.hands:
+                    if hand.active:
+                        yield from self.play_hand(hand)
+                self.reveal()
+                if player.has_active_hands():
+                    while dealer.value() < 17:
+                        self.deal(dealer)
+                    for hand in player.active_hands():
+                        self.settle(hand)
+
+            net = player.chips - chips
+            self.net += net
+            self.squares += net * net
+
+    def play_hand(self, hand):
+        """Generator playing a single hand, yielding each decision needed"""
+        player = self.player
+        offer_split = player.can_split(hand)
+        while True:
+            if hand.twenty_one():
+                return
+            if hand.bust():
+                self.bust(hand)
+                return
+            can_double = player.can_double_down(hand)
+            resp = yield ('A', self.state(hand, offer_split, can_double))
+            hand.actions += resp
+            if resp == 'P' and offer_split:
+                new_hand = hand.split()
+                player.bet(hand.stake)
+                self.deal(hand)
+                self.deal(new_hand)
+                new_hand.actions = hand.actions
+                player.hands.append(new_hand)
+            elif resp == 'H':
+                self.deal(hand)
+            elif resp == 'S':
+                return
+            elif resp == 'D' and can_double:
+                player.bet(hand.stake)
+                hand.stake += hand.stake
+                self.deal(hand)
+                if hand.bust():
+                    self.bust(hand)
+                return
+            else:
+                raise ValueError("invalid action {!r} for {}".format(resp, hand))
+            offer_split = False
+
+
+class Simulation(object):
+    """Plays a table per seed, batching decisions across all tables"""
+
+    def __init__(self, strategy, seeds, rounds, chips=None, bet=MIN_BET, history=None,
+                 deck=Deck, shoe_rounds=None):
+        # pylint: disable=too-many-arguments
+        self.strategy = strategy
+        self.tables = list(Table(seed, rounds, chips, bet, history, deck, shoe_rounds)
+                           for seed in seeds)
+
+    def run(self):
+        """Play every table to completion"""
+        pending = []
+        for table in self.tables:
+            table.game = table.play()
+            self.__advance(table, None, pending)
+        while pending:
+            insure = list(p for p in pending if p[1][0] == 'I')
+            decide = list(p for p in pending if p[1][0] == 'A')
+            pending = []
+            if insure:
+                answers = self.strategy.insure(list(r[1] for _, r in insure))
+                for (table, _), answer in zip(insure, answers):
+                    self.__advance(table, answer, pending)
+            if decide:
+                answers = self.strategy.decide(list(r[1] for _, r in decide))
+                for (table, _), answer in zip(decide, answers):
+                    self.__advance(table, answer, pending)
+        return self
+
+    @staticmethod
+    def __advance(table, answer, pending):
+        """Resume the table until its next decision, if it has one"""
+        try:
+            pending.append((table, table.game.send(answer)))
+        except StopIteration:
+            table.game = None
+
+    def summary(self):
+        """Totals across every table: rounds, net chips and results"""
+        totals = {'rounds': 0, 'net': 0, 'squares': 0,
+                  'wins': 0, 'ties': 0, 'losses': 0}
+        for table in self.tables:
+            totals['rounds'] += table.round
+            totals['net'] += table.net
+            totals['squares'] += table.squares
+            for key, value in table.player.results.items():
+                totals[key] += value
+        return totals
+
+
+def compare(first, second, seeds, rounds, shoe_rounds=1, deck=Deck, z=1.96):
+    """Compare two strategies on common random numbers
+
+    Both strategies play a table per seed, starting a new shoe every
+    shoe_rounds rounds from the same shuffle, so each seed gives a paired
+    difference in net chips per round (first minus second). Returns the
+    mean difference with its confidence interval and the totals of each
+    side.
+
+    Only the first round of a shoe is dealt the same for both strategies
+    for certain. With one round per shoe the pairing is closest, but the
+    true count never builds up, so a strategy that plays the count looks
+    like basic strategy. Compare those with several rounds to a shoe. No
+    antithetic shoes are offered: none found gives the paired difference
+    a useful negative correlation.
+    """
+    # pylint: disable=too-many-arguments
+    runs = list(Simulation(strategy, seeds, rounds, deck=deck, shoe_rounds=shoe_rounds).run()
+                for strategy in (first, second))
+    samples = list((a.net - b.net) / float(rounds)
+                   for a, b in zip(runs[0].tables, runs[1].tables))
+    count = len(samples)
+    mean = sum(samples) / count
+    spread = 0.0
+    if count > 1:
+        variance = sum((x - mean) ** 2 for x in samples) / (count - 1)
+        spread = z * math.sqrt(variance / count)
+    return {'difference': mean, 'low': mean - spread, 'high': mean + spread,
+            'samples': count,
+            'first': runs[0].summary(), 'second': runs[1].summary()}
+
+
+def merge(summaries):
+    """Add together simulation summaries"""
+    totals = {}
+    for summary in summaries:
+        for key, value in summary.items():
+            totals[key] = totals.get(key, 0) + value
+    return totals
+
+
+def table_seeds(seed, start, count):
+    """Seeds for tables start to start + count of a job seeded with seed"""
+    return range(seed * 2 ** 32 + start, seed * 2 ** 32 + start + count)
+
+
+def run_job(job, start, count):
+    """Play tables start to start + count of a job and return their totals
+
+    A job is a dict naming the strategy (a key of STRATEGIES), the seed,
+    the rounds played at each table and, optionally, the bet and the
+    number of decks in the shoe.
+    """
+    strategy = STRATEGIES[job['strategy']]()
+    deck = partial(Deck, decks=job.get('decks', 1))
+    seeds = table_seeds(job['seed'], start, count)
+    sim = Simulation(strategy, seeds, job['rounds'], bet=job.get('bet', MIN_BET), deck=deck)
+    return sim.run().summary()
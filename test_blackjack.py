@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import random
 import sys
 import unittest
 
@@ -50,6 +51,11 @@ class DeckTestCase(unittest.TestCase):
         deck = Deck()
         self.assertEqual(len(deck.cards), 52)
 
+    def test_size_of_multiple_decks(self):
+        """Are there 52 cards for each deck in use?"""
+        deck = Deck(decks=6)
+        self.assertEqual(len(deck.cards), 6 * 52)
+
     def test_shuffle_randomizes_deck(self):
         """Does the deck get shuffled?"""
         deck_one = Deck()
@@ -71,6 +77,14 @@ class DeckTestCase(unittest.TestCase):
         deck = Deck()
         self.assertIsInstance(deck.deal(), Card)
 
+    def test_seeded_decks_match(self):
+        """Do decks shuffled from the same seed deal the same cards?"""
+        deck_one = Deck(random.Random(7))
+        deck_one.shuffle()
+        deck_two = Deck(random.Random(7))
+        deck_two.shuffle()
+        self.assertEqual(str(deck_one.cards), str(deck_two.cards))
+
     def test_empty_deck_refills(self):
         """Does an empty deck get refilled?"""
         deck = Deck()
@@ -110,6 +124,15 @@ class HandTestCase(unittest.TestCase):
         hand.add_card(Card("7", "♡"))
         self.assertEqual(hand.value(), 14)
 
+    def test_soft_hand_detected(self):
+        """Is an Ace counted as 11 reported as a soft hand?"""
+        hand = Hand()
+        hand.add_card(Card("A", "♡"))
+        hand.add_card(Card("6", "♡"))
+        self.assertTrue(hand.soft())
+        hand.add_card(Card("9", "♡"))
+        self.assertFalse(hand.soft())
+
     def test_blackjack_detected(self):
         """Does 'blackjack' get detected correctly?"""
         hand = Hand()
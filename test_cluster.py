@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import socket
+import threading
+import unittest
+
+from cluster import Coordinator, work, send, receive
+from simulation import run_job
+
+JOB = {'strategy': 'basic', 'seed': 7, 'rounds': 20, 'tables': 12}
+
+
+class ClusterTestCase(unittest.TestCase):
+    """Unit tests for the simulation coordinator and workers"""
+
+    def start_workers(self, coordinator, count):
+        """Run workers against the coordinator in background threads"""
+        threads = list(threading.Thread(target=work, args=coordinator.address)
+                       for _ in range(count))
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        return threads
+
+    def lease_and_hold(self, coordinator):
+        """Lease a chunk as a worker that never returns a result"""
+        connection = socket.create_connection(coordinator.address)
+        stream = connection.makefile('rwb')
+        send(stream, {'op': 'lease'})
+        self.assertEqual(receive(stream)['op'], 'chunk')
+        return connection, stream
+
+    def test_totals_match_single_node(self):
+        """Do merged chunk totals match playing the job in one go?"""
+        coordinator = Coordinator(JOB, chunk=5)
+        self.start_workers(coordinator, 3)
+        self.assertEqual(coordinator.run(), run_job(JOB, 0, JOB['tables']))
+
+    def test_chunks_of_dead_worker_released(self):
+        """Is a chunk leased to a worker that disconnects leased again?"""
+        coordinator = Coordinator(JOB, chunk=5)
+        thread = threading.Thread(target=coordinator.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        connection, stream = self.lease_and_hold(coordinator)
+        self.assertEqual(len(coordinator.leases), 1)
+        stream.close()
+        connection.close()
+        coordinator.server.shutdown()
+        self.start_workers(coordinator, 1)
+        self.assertEqual(coordinator.run(), run_job(JOB, 0, JOB['tables']))
+
+    def test_expired_lease_released(self):
+        """Is a chunk whose lease runs out leased again?"""
+        coordinator = Coordinator(JOB, chunk=5, lease=0)
+        thread = threading.Thread(target=coordinator.server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        connection, stream = self.lease_and_hold(coordinator)
+        coordinator.server.shutdown()
+        self.start_workers(coordinator, 1)
+        try:
+            self.assertEqual(coordinator.run(), run_job(JOB, 0, JOB['tables']))
+        finally:
+            stream.close()
+            connection.close()
+
+    def test_malformed_message_disconnects(self):
+        """Is a worker sending a malformed message treated as gone?"""
+        summary = {'rounds': 1, 'net': 0, 'squares': 0, 'wins': 0, 'ties': 1, 'losses': 0}
+        for message in ({'chunk': 0}, ['lease'], {'op': 'result', 'chunk': 0},
+                        {'op': 'result', 'chunk': 99, 'summary': summary},
+                        {'op': 'result', 'chunk': 0.5, 'summary': summary},
+                        {'op': 'result', 'chunk': True, 'summary': summary},
+                        {'op': 'result', 'chunk': 0, 'summary': {}},
+                        {'op': 'result', 'chunk': 0, 'summary': dict(summary, net='0')}):
+            coordinator = Coordinator(JOB, chunk=5)
+            rfile = io.BytesIO()
+            send(rfile, {'op': 'lease'})
+            send(rfile, message)
+            send(rfile, {'op': 'lease'})
+            rfile.seek(0)
+            wfile = io.BytesIO()
+            coordinator.serve(rfile, wfile, self)
+            coordinator.server.server_close()
+            self.assertEqual(len(wfile.getvalue().splitlines()), 1)
+            self.assertEqual(coordinator.leases, {})
+            self.assertEqual(coordinator.results, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
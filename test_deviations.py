@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import array
+import os
+import shutil
+import tempfile
+import unittest
+
+from deviations import *
+
+
+class DeviationsTestCase(unittest.TestCase):
+    """Unit tests for the strategy deviation generator"""
+
+    def test_cells_cover_game_decisions(self):
+        """Are hard, soft, pair and insurance cells all generated?"""
+        every = list(cells())
+        self.assertEqual(len(every), 10 * (16 + 8 + 10) + 1)
+        self.assertIn(('K', '6', '10', 'hand'), every)
+        self.assertIn(('A', '7', '9', 'hand'), every)
+        self.assertIn(('8', '8', 'A', 'hand'), every)
+        self.assertEqual(every[-1][3], 'insurance')
+
+    def test_describe_cell(self):
+        """Does a cell describe the state basic strategy sees?"""
+        self.assertEqual(describe(('A', 'A', '6', 'hand')), State(12, True, True, True, 6, 0))
+        self.assertEqual(describe(('K', 'Q', 'A', 'hand')), State(20, False, False, True, 11, 0))
+
+    def test_stacked_shoe_count(self):
+        """Is a stacked shoe recreated at the target true count?"""
+        cell = ('K', '6', '10', 'hand')
+        stacked = stack_shoes(1, cell, 3, 4, array.array('Q'), seed=1)
+        self.assertEqual(len(stacked), 4)
+        for packed in stacked:
+            shoe = stacked_shoe(1, cell, 3, packed, seed=1)
+            running = -sum(HILO[rank] for rank in shoe)
+            self.assertEqual(int(round(running * 52.0 / len(shoe))), 3)
+            self.assertGreaterEqual(len(shoe), 13)
+        self.assertEqual(stacked_shoe(1, cell, 3, stacked[0], seed=1),
+                         stacked_shoe(1, cell, 3, stacked[0], seed=1))
+
+    def test_forced_stand_keeps_cards(self):
+        """Does standing on the cell play out against the stacked dealer?"""
+        shoe = ['5', '9', '7']
+        self.assertEqual(play_out(('K', '8', '10', 'hand'), shoe, 'S'), 1)
+        self.assertEqual(play_out(('K', '8', '10', 'hand'), shoe, 'H'), -1)
+
+    def test_crossing(self):
+        """Is the zero crossing of the differences found?"""
+        self.assertEqual(crossing({-2: -0.2, 0: 0.0, 2: 0.2}), (0, 1))
+        self.assertEqual(crossing({-2: 0.3, 0: 0.1, 2: -0.1}), (1, -1))
+        self.assertIsNone(crossing({-2: 0.3, 0: 0.4, 2: 0.5}))
+
+    def test_generate_keeps_shoe_library(self):
+        """Are index plays generated and stacked shoes kept for reuse?"""
+        path = tempfile.mkdtemp()
+        try:
+            library = ShoeLibrary(os.path.join(path, 'shoes.pickle'))
+            cell = ('K', '6', '10', 'hand')
+            generate(counts=(-1, 1), shoes=5, processes=1, library=library, only=[cell])
+            reloaded = ShoeLibrary(os.path.join(path, 'shoes.pickle'))
+            self.assertEqual(len(reloaded.get(1, 0, cell)[1]), 5)
+            self.assertEqual(reloaded.get(1, 0, cell)[1].typecode, 'Q')
+            self.assertEqual(reloaded.get(1, 1, cell), {})
+            generate(counts=(3,), shoes=4, processes=1, library=reloaded, seed=1, only=[cell])
+            for packed in reloaded.get(1, 1, cell)[3]:
+                shoe = stacked_shoe(1, cell, 3, packed, seed=1)
+                running = -sum(HILO[rank] for rank in shoe)
+                self.assertEqual(int(round(running * 52.0 / len(shoe))), 3)
+        finally:
+            shutil.rmtree(path)
+
+    def test_insurance_index(self):
+        """Is insurance found worth taking from a small positive count?"""
+        cell = INSURANCE_HAND + ('A', 'insurance')
+        plays = generate(counts=(-4, -2, 0, 2, 4, 6), shoes=1500, processes=1, only=[cell])
+        self.assertEqual(len(plays), 1)
+        self.assertEqual((plays[0]['action'], plays[0]['direction']), ('I', 1))
+        self.assertTrue(0 <= plays[0]['index'] <= 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from driver import run, percentiles
+
+
+class DriverTestCase(unittest.TestCase):
+    """Unit tests for the scripted game driver"""
+
+    def test_scripted_game_runs_to_results(self):
+        """Does a script of defaults play rounds and show results?"""
+        result = run([''] * 40, seed=3)
+        self.assertIn("Welcome to Blackjack!", result.transcript)
+        self.assertIn("Thanks for playing.", result.transcript)
+        self.assertIn("chips:", result.transcript)
+        self.assertEqual(len(result.prompts), 40 + 1)
+        self.assertTrue(result.rounds)
+
+    def test_same_seed_same_transcript(self):
+        """Is a seeded script replayed identically?"""
+        one = run(['', '50'] + ['', '10', 'S'] * 5, seed=5)
+        two = run(['', '50'] + ['', '10', 'S'] * 5, seed=5)
+        self.assertEqual(one.transcript, two.transcript)
+
+    def test_script_ends_before_game_starts(self):
+        """Does an empty script end the game cleanly?"""
+        result = run([])
+        self.assertIn("Thanks for playing.", result.transcript)
+
+    def test_percentiles(self):
+        """Are timings summarised in milliseconds?"""
+        self.assertEqual(percentiles([]), "none")
+        self.assertIn("max=2.000ms", percentiles([0.001, 0.002]))
+
+
+if __name__ == '__main__':
+    unittest.main()
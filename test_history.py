@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import glob
+import os
+import shutil
+import tempfile
+import unittest
+
+from blackjack import Card, Game, Hand
+from history import CARD_RANK, HandHistory, HistoryIndex, VALUES, load, actions, read_header, situation
+from simulation import BasicStrategy, Simulation
+
+
+class HandHistoryTestCase(unittest.TestCase):
+    """Unit tests for the columnar hand history store"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_rows_flush_in_chunks(self):
+        """Do full chunks get written to disk as rows are appended?"""
+        history = HandHistory(self.path, chunk_size=2)
+        for n in range(5):
+            history.append(n, "foo", "A", "5", "10", "HS", 18, 20, -10)
+        self.assertEqual(len(os.listdir(self.path)), 2)
+        history.close()
+        self.assertEqual(len(os.listdir(self.path)), 3)
+
+    def test_load_returns_columns(self):
+        """Are appended rows read back column by column?"""
+        with HandHistory(self.path, chunk_size=2) as history:
+            history.append(1, "foo", "A", "5", "10", "HS", 18, 20, -10)
+            history.append(1, "bar", "8", "8", "6", "PD", 21, 26, 20)
+            history.append(2, "foo", "A", "K", "2", "", 21, 12, 15)
+        cols = load(self.path)
+        self.assertEqual(list(cols['round']), [1, 1, 2])
+        self.assertEqual(cols['names'], ["foo", "bar"])
+        self.assertEqual(list(cols['player']), [0, 1, 0])
+        self.assertEqual(list(cols['payout']), [-10, 20, 15])
+        self.assertEqual(list(cols['total']), [18, 21, 21])
+        self.assertEqual(actions(cols, 0), "HS")
+        self.assertEqual(actions(cols, 1), "PD")
+        self.assertEqual(actions(cols, 2), "")
+
+    def test_names_kept_across_sessions(self):
+        """Are players' hands still theirs after the history is reopened?"""
+        with HandHistory(self.path) as history:
+            history.append(1, "alice", "9", "7", "K", "S", 16, 20, -10)
+        with HandHistory(self.path) as history:
+            history.append(2, "bob", "10", "8", "6", "S", 18, 22, 10)
+            history.append(3, "alice", "5", "5", "6", "D", 20, 19, 20)
+        cols = load(self.path)
+        self.assertEqual(cols['names'], ["alice", "bob"])
+        self.assertEqual(list(cols['player']), [0, 1, 0])
+
+    def test_load_maps_each_chunks_names(self):
+        """Are player ids read through the names table of their own chunk?"""
+        for name in ("alice", "bob"):
+            history = HandHistory(self.path)
+            history.names, history.name_ids, history.names_written = [], {}, 0
+            history.append(1, name, "9", "7", "K", "S", 16, 20, -10)
+            history.close()
+        cols = load(self.path)
+        self.assertEqual(cols['names'], ["alice", "bob"])
+        self.assertEqual(list(cols['player']), [0, 1])
+
+    def test_many_players_written_once(self):
+        """Do chunks hold only new names, for more players than fit in 16 bits?"""
+        with HandHistory(self.path, chunk_size=10000) as history:
+            for n in range(70000):
+                history.append(n, "table-{}".format(n), "9", "7", "K", "S", 16, 20, -10)
+        headers = list(read_header(os.path.join(self.path, name))
+                       for name in sorted(os.listdir(self.path)))
+        self.assertEqual(sum(len(header['names']) for header in headers), 70000)
+        cols = load(self.path)
+        self.assertEqual(cols['player'][-1], 69999)
+        self.assertEqual(cols['names'][69999], "table-69999")
+
+    def test_game_records_settled_hands(self):
+        """Does the game append a row when a hand is settled?"""
+        history = HandHistory(self.path)
+        game = Game(['foo'], 100, history)
+        player = game.players[0]
+        game.dealer = Hand()
+        game.dealer.add_card(Card("10", "♡"))
+        game.dealer.add_card(Card("8", "♡"))
+        hand = Hand(player.bet(10))
+        hand.add_card(Card("10", "♢"))
+        hand.add_card(Card("9", "♢"))
+        hand.actions = 'S'
+        game.settle_outcome(game.dealer, player, hand)
+        history.close()
+        cols = load(self.path)
+        self.assertEqual(list(cols['payout']), [10])
+        self.assertEqual(list(cols['dealer']), [18])
+        self.assertEqual(actions(cols, 0), "S")
+
+
+class HistoryIndexTestCase(unittest.TestCase):
+    """Unit tests for the decision situation index"""
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        with HandHistory(self.path, chunk_size=500, index=True) as history:
+            Simulation(BasicStrategy(), range(3), 400, history=history).run()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def scan(self, total, upcard, soft, pair, action):
+        """Rows and totals for a situation, found by reading every row"""
+        # pylint: disable=too-many-arguments
+        cols = load(self.path)
+        rows = []
+        for row in range(len(cols['payout'])):
+            first, second = (CARD_RANK[cols[n][row]] for n in ('first', 'second'))
+            found = situation(first, second, actions(cols, row))
+            up = VALUES[CARD_RANK[cols['upcard'][row]]]
+            if found[:3] == (total, soft, pair) and up == upcard and \
+               action in (None, found[3]):
+                rows.append(row)
+        payouts = list(cols['payout'][row] for row in rows)
+        return rows, {'hands': len(rows), 'wins': sum(p > 0 for p in payouts),
+                      'ties': payouts.count(0), 'losses': sum(p < 0 for p in payouts),
+                      'chips': sum(payouts)}
+
+    def test_split_hand_is_a_pair(self):
+        """Is a split hand indexed as the pair it was split from?"""
+        self.assertEqual(situation("8", "3", "PH"), (16, False, True, 'P'))
+        self.assertEqual(situation("A", "A", "P"), (12, True, True, 'P'))
+        self.assertEqual(situation("A", "6", "DH"), (17, True, False, 'D'))
+
+    def test_queries_match_a_full_scan(self):
+        """Does the index agree with scanning every row of the history?"""
+        index = HistoryIndex(self.path)
+        queries = [(16, 10, False, False, None), (16, 10, False, False, 'H'),
+                   (11, 6, False, False, 'D'), (18, 9, True, False, None),
+                   (16, 11, False, True, 'P'), (20, 10, False, True, 'S')]
+        for query in queries:
+            rows, totals = self.scan(*query)
+            self.assertEqual(index.summary(*query), totals)
+            self.assertEqual(list(index.rows_for(*query)), rows)
+        self.assertEqual(index.rows, len(load(self.path)['payout']))
+
+    def test_index_continues_when_reopened(self):
+        """Are hands appended after reopening indexed after the earlier ones?"""
+        before = HistoryIndex(self.path).summary(16, 10)
+        with HandHistory(self.path, chunk_size=500, index=True) as history:
+            history.append(1, "foo", "9", "7", "K", "S", 16, 20, -10)
+            history.append(1, "foo", "10", "6", "Q", "H", 26, 20, -10)
+        index = HistoryIndex(self.path)
+        rows, totals = self.scan(16, 10, False, False, None)
+        self.assertEqual(index.summary(16, '10'), totals)
+        self.assertEqual(totals['hands'], before['hands'] + 2)
+        self.assertEqual(list(index.rows_for(16, 10))[-2:], rows[-2:])
+
+    def test_index_added_to_existing_history(self):
+        """Does an index created on an existing history cover its rows?"""
+        for filename in glob.glob(os.path.join(self.path, "index-*")):
+            os.remove(filename)
+        with HandHistory(self.path, index=True) as history:
+            history.append(1, "foo", "9", "7", "K", "S", 16, 20, -10)
+        index = HistoryIndex(self.path)
+        self.assertEqual(index.rows, len(load(self.path)['payout']))
+        for query in ((16, 10, False, False, 'S'), (11, 6, False, False, 'D')):
+            rows, totals = self.scan(*query)
+            self.assertEqual(index.summary(*query), totals)
+            self.assertEqual(list(index.rows_for(*query)), rows)
+
+    def test_index_out_of_step_rejected(self):
+        """Is an index that misses rows of the history refused?"""
+        with HandHistory(self.path, chunk_size=500) as history:
+            history.append(1, "foo", "9", "7", "K", "S", 16, 20, -10)
+        with self.assertRaises(ValueError):
+            HandHistory(self.path, index=True)
+
+if __name__ == '__main__':
+    unittest.main()
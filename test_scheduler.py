@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+
+from scheduler import Progress, house_edge, next_job, schedule
+
+
+class SchedulerTestCase(unittest.TestCase):
+    """Unit tests for the adaptive simulation scheduler"""
+
+    def test_house_edge_interval(self):
+        """Is the edge and its interval computed from the totals?"""
+        edge, width = house_edge({'rounds': 4, 'net': -20, 'squares': 400}, 10)
+        self.assertAlmostEqual(edge, 0.5)
+        self.assertAlmostEqual(width, 1.96 * (300 / 3.0 / 4) ** 0.5 / 10)
+        self.assertEqual(house_edge({}, 10)[1], float('inf'))
+
+    def test_widest_interval_chosen(self):
+        """Does the least certain job get the next increment?"""
+        job = {'strategy': 'basic', 'seed': 1, 'rounds': 10}
+        narrow, wide = Progress(job, 1.96), Progress(job, 1.96)
+        narrow.totals = {'rounds': 1000, 'net': 0, 'squares': 100000}
+        wide.totals = {'rounds': 100, 'net': 0, 'squares': 10000}
+        progress = {'narrow': narrow, 'wide': wide}
+        self.assertEqual(next_job(progress, 0.01), 'wide')
+        self.assertIsNone(next_job(progress, 1.0))
+
+    def test_unstarted_jobs_spread_out(self):
+        """Are jobs with no results yet each given an increment first?"""
+        job = {'strategy': 'basic', 'seed': 1, 'rounds': 10}
+        progress = {'one': Progress(job, 1.96), 'two': Progress(job, 1.96)}
+        progress['two'].running = 1
+        self.assertEqual(next_job(progress, 0.01), 'one')
+
+    def test_running_increments_projected(self):
+        """Are the rounds of every table in a running increment counted?"""
+        job = {'strategy': 'basic', 'seed': 1, 'rounds': 10}
+        progress = Progress(job, 1.96, tables=20)
+        progress.totals = {'rounds': 200, 'net': 0, 'squares': 20000}
+        width = progress.edge()[1]
+        progress.running = 1
+        self.assertAlmostEqual(progress.projected(), width * (200 / 400.0) ** 0.5)
+
+    def test_running_increments_spread_workers(self):
+        """Does a job with an increment running give way to a slightly narrower one?"""
+        job = {'strategy': 'basic', 'seed': 1, 'rounds': 10}
+        wide, narrower = Progress(job, 1.96, tables=20), Progress(job, 1.96, tables=20)
+        wide.totals = {'rounds': 200, 'net': 0, 'squares': 20000}
+        narrower.totals = {'rounds': 250, 'net': 0, 'squares': 25000}
+        wide.running = 1
+        self.assertEqual(next_job({'wide': wide, 'narrower': narrower}, 0.01), 'narrower')
+
+    def test_schedule_stops_at_budget(self):
+        """Does scheduling stop once the CPU budget is spent?"""
+        jobs = {'one deck': {'strategy': 'basic', 'seed': 1, 'rounds': 20},
+                'six decks': {'strategy': 'basic', 'seed': 1, 'rounds': 20, 'decks': 6}}
+        report = schedule(jobs, target=0.0001, budget=0.5, tables=5, processes=2)
+        self.assertEqual(set(report), set(jobs))
+        for entry in report.values():
+            self.assertGreater(entry['rounds'], 0)
+            self.assertFalse(entry['converged'])
+            self.assertEqual(entry['rounds'] % 100, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+import unittest
+from functools import partial
+
+from blackjack import Card
+from simulation import *
+
+
+class RecordingStrategy(BasicStrategy):
+    """Basic strategy that remembers the size of every batch"""
+
+    def __init__(self):
+        self.batches = []
+
+    def decide(self, states):
+        self.batches.append(len(states))
+        return super(RecordingStrategy, self).decide(states)
+
+
+class BasicStrategyTestCase(unittest.TestCase):
+    """Unit tests for the basic strategy table"""
+
+    def test_hard_totals(self):
+        """Are hard totals played by the book?"""
+        action = BasicStrategy.action
+        self.assertEqual(action(State(16, False, False, False, 10, 0)), 'H')
+        self.assertEqual(action(State(16, False, False, False, 6, 0)), 'S')
+        self.assertEqual(action(State(11, False, False, True, 6, 0)), 'D')
+        self.assertEqual(action(State(11, False, False, False, 6, 0)), 'H')
+
+    def test_soft_totals_and_pairs(self):
+        """Are soft totals and pairs played by the book?"""
+        action = BasicStrategy.action
+        self.assertEqual(action(State(18, True, False, False, 9, 0)), 'H')
+        self.assertEqual(action(State(18, True, False, False, 5, 0)), 'S')
+        self.assertEqual(action(State(12, True, True, True, 10, 0)), 'P')
+        self.assertEqual(action(State(20, False, True, True, 6, 0)), 'S')
+
+
+class SimulationTestCase(unittest.TestCase):
+    """Unit tests for the batched simulation engine"""
+
+    def test_every_round_is_played(self):
+        """Does every table play the rounds requested?"""
+        sim = Simulation(BasicStrategy(), range(20), 50).run()
+        totals = sim.summary()
+        self.assertEqual(totals['rounds'], 20 * 50)
+        self.assertGreaterEqual(totals['wins'] + totals['ties'] + totals['losses'], 1000)
+        self.assertEqual(totals['net'], sum(t.player.chips - 5000 for t in sim.tables))
+
+    def test_same_seeds_same_results(self):
+        """Do identical seeds produce identical totals?"""
+        one = Simulation(BasicStrategy(), range(10), 50).run().summary()
+        two = Simulation(BasicStrategy(), range(10), 50).run().summary()
+        self.assertEqual(one, two)
+
+    def test_decisions_are_batched(self):
+        """Are decisions from many tables handed over together?"""
+        strategy = RecordingStrategy()
+        Simulation(strategy, range(100), 5).run()
+        self.assertGreater(max(strategy.batches), 50)
+
+    def test_invalid_action_rejected(self):
+        """Is an action the hand cannot take rejected?"""
+        class Splitter(Strategy):
+            def decide(self, states):
+                return ['P'] * len(states)
+        with self.assertRaises(ValueError):
+            Simulation(Splitter(), range(20), 20).run()
+
+
+class IndexStrategyTestCase(unittest.TestCase):
+    """Unit tests for count-indexed deviations"""
+
+    def test_deviation_at_index(self):
+        """Is basic strategy departed from once the count reaches the index?"""
+        strategy = IndexStrategy([
+            {'total': 16, 'soft': False, 'pair': False, 'upcard': 10,
+             'action': 'S', 'index': 0, 'direction': 1},
+            {'action': 'I', 'upcard': 11, 'index': 3, 'direction': 1}])
+        self.assertEqual(strategy.decide([State(16, False, False, True, 10, -1),
+                                          State(16, False, False, True, 10, 2)]), ['H', 'S'])
+        self.assertEqual(strategy.insure([State(17, False, False, True, 11, 2),
+                                          State(17, False, False, True, 11, 3)]), [False, True])
+
+    def test_hole_card_not_counted(self):
+        """Is the dealer's hole card left out of the count until revealed?"""
+        table = Table(0, 1)
+        table.deck.cards = [Card(r, "♡") for r in ["8"] * 48 + ["K", "9", "7", "9"]]
+        game = table.play()
+        kind, state = next(game)
+        self.assertEqual((kind, state.total, state.count), ('A', 18, 0))
+        self.assertEqual(table.running, 0)
+        with self.assertRaises(StopIteration):
+            game.send('S')
+        self.assertEqual(table.running, -1)
+
+
+class StandStrategy(Strategy):
+    """Never draws a card"""
+
+    def decide(self, states):
+        return ['S'] * len(states)
+
+
+class HitStrategy(Strategy):
+    """Always draws a card"""
+
+    def decide(self, states):
+        return ['H'] * len(states)
+
+
+class CountingStrategy(BasicStrategy):
+    """Basic strategy that remembers the true count of every decision"""
+
+    def __init__(self):
+        self.counts = []
+
+    def decide(self, states):
+        self.counts.extend(state.count for state in states)
+        return super(CountingStrategy, self).decide(states)
+
+
+class RecordingHistory(object):
+    """Keeps the first two cards and dealer up card of every settled hand"""
+
+    def __init__(self):
+        self.cards = []
+
+    def append(self, *row):
+        self.cards.append(row[2:5])
+
+
+class CompareTestCase(unittest.TestCase):
+    """Unit tests for paired strategy comparison"""
+
+    def test_identical_strategies_do_not_differ(self):
+        """Do identical strategies on common shoes show no difference?"""
+        result = compare(BasicStrategy(), BasicStrategy(), range(20), 20)
+        self.assertEqual(result['difference'], 0)
+        self.assertEqual(result['low'], result['high'])
+        self.assertEqual(result['first'], result['second'])
+
+    def test_better_strategy_detected(self):
+        """Does basic strategy significantly beat always standing?"""
+        result = compare(BasicStrategy(), StandStrategy(), range(200), 50)
+        self.assertGreater(result['low'], 0)
+        self.assertEqual(result['samples'], 200)
+        self.assertEqual(result['first']['rounds'], 200 * 50)
+
+    def test_fresh_shoes_repeat_each_round(self):
+        """Does every round start from the same shoe whatever was drawn before?"""
+        stand, hit = RecordingHistory(), RecordingHistory()
+        Simulation(StandStrategy(), [7], 30, history=stand, shoe_rounds=1).run()
+        Simulation(HitStrategy(), [7], 30, history=hit, shoe_rounds=1).run()
+        self.assertEqual(len(stand.cards), 30)
+        self.assertEqual(stand.cards, hit.cards)
+
+    def test_paired_variance_below_independent(self):
+        """Is the paired difference less variable than independent runs?"""
+        seeds, rounds = range(300), 10
+        paired = compare(BasicStrategy(), StandStrategy(), seeds, rounds)
+        first = Simulation(BasicStrategy(), seeds, rounds, shoe_rounds=1).run()
+        second = Simulation(StandStrategy(), range(300, 600), rounds, shoe_rounds=1).run()
+        samples = list((a.net - b.net) / float(rounds)
+                       for a, b in zip(first.tables, second.tables))
+        mean = sum(samples) / len(samples)
+        variance = sum((x - mean) ** 2 for x in samples) / (len(samples) - 1)
+        spread = 1.96 * math.sqrt(variance / len(samples))
+        self.assertLess(paired['high'] - paired['difference'], 0.8 * spread)
+
+    def test_counts_build_up_in_longer_shoes(self):
+        """Do shoes of several rounds start alike and let the count build up?"""
+        stand, hit = RecordingHistory(), RecordingHistory()
+        Simulation(StandStrategy(), [7], 30, history=stand, shoe_rounds=5).run()
+        Simulation(HitStrategy(), [7], 30, history=hit, shoe_rounds=5).run()
+        self.assertEqual(stand.cards[::5], hit.cards[::5])
+        counts = []
+        for shoe_rounds in (1, 5):
+            strategy = CountingStrategy()
+            Simulation(strategy, range(50), 10, deck=partial(Deck, decks=2),
+                       shoe_rounds=shoe_rounds).run()
+            counts.append(max(abs(count) for count in strategy.counts))
+        self.assertGreater(counts[1], counts[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import io
+import os
+import unittest
+from unittest import mock
+
+import blackjack
+from blackjack import Card, Game, Hand
+from driver import run
+from tui import Screen, TableView
+
+
+class ScreenTestCase(unittest.TestCase):
+    """Unit tests for the diffing screen model"""
+
+    def test_first_update_clears_screen(self):
+        """Does the first update clear the screen and draw everything?"""
+        out = io.StringIO()
+        screen = Screen(2, 20, out)
+        screen.update([[("hello", None)], [("world", 'red')]])
+        self.assertTrue(out.getvalue().startswith("\033[H\033[J"))
+        self.assertIn("hello", out.getvalue())
+        self.assertIn("\033[31mworld\033[0m", out.getvalue())
+
+    def test_unchanged_screen_writes_nothing(self):
+        """Does redrawing the same lines send no bytes?"""
+        screen = Screen(2, 20, io.StringIO())
+        screen.update([[("hello", None)], [("world", None)]])
+        written = screen.written
+        screen.update([[("hello", None)], [("world", None)]])
+        self.assertEqual(screen.written, written)
+
+    def test_only_changed_cells_written(self):
+        """Are only the changed cells sent, at the right position?"""
+        out = io.StringIO()
+        screen = Screen(2, 20, out)
+        screen.update([[("chips  100", None)], [("world", None)]])
+        start = len(out.getvalue())
+        screen.update([[("chips  120", None)], [("world", None)]])
+        self.assertEqual(out.getvalue()[start:], "\033[1;9H2")
+
+    def test_shorter_row_erased(self):
+        """Is a row that gets shorter erased to the end of the line?"""
+        out = io.StringIO()
+        screen = Screen(1, 20, out)
+        screen.update([[("you beat the dealer", None)]])
+        start = len(out.getvalue())
+        screen.update([[("you", None)]])
+        self.assertEqual(out.getvalue()[start:], "\033[1;5H\033[K")
+
+
+class TableViewTestCase(unittest.TestCase):
+    """Unit tests for the full-screen table view"""
+
+    def test_frame_shows_table(self):
+        """Does the frame show chips, hands and messages for each seat?"""
+        game = Game(['foo', 'bar'], 100)
+        view = TableView(game, out=io.StringIO())
+        game.dealer = Hand()
+        game.dealer.add_card(Card("K", "♡"))
+        game.dealer.add_card(Card("7", "♡"))
+        game.players[0].hands = [Hand(10)]
+        game.players[0].hands[0].add_card(Card("9", "♢"))
+        view.message('foo', 'busted! :(')
+        text = "\n".join("".join(t for t, _ in line) for line in view.frame())
+        self.assertIn(" K♡  ??", text)
+        self.assertNotIn("7♡", text)
+        self.assertIn("chips  100", text)
+        self.assertIn(" 9 :  9♢", text)
+        self.assertIn("busted! :(", text)
+        game.reveal = True
+        text = "\n".join("".join(t for t, _ in line) for line in view.frame())
+        self.assertIn("17 :  K♡   7♡", text)
+
+    def test_status_keeps_latest_messages(self):
+        """Are the earliest messages dropped when a seat's row is full?"""
+        game = Game(['foo'], 100)
+        view = TableView(game, width=40, out=io.StringIO())
+        view.message('foo', 'you won your insurance bet!')
+        view.message('foo', 'you lost to the dealer :(')
+        self.assertEqual(view.status_text('foo'), 'you lost to the dealer :(')
+        view.message('foo', 'busted! :(')
+        self.assertEqual(view.status_text('foo'), 'you lost to the dealer :(  busted! :(')
+        view.refresh()
+        view.message('foo', 'busted! :(')
+        self.assertEqual(view.status_text('foo'), 'busted! :(')
+
+    def test_fewer_bytes_per_round_than_plain(self):
+        """Does a five player game send far fewer bytes per round in the view?"""
+        answers = ['ann bob cat dan eve', '1000'] + [''] * 200
+        sizes = []
+        for tui in (False, True):
+            with mock.patch.dict(os.environ, {'COLUMNS': '80', 'LINES': '24'}):
+                result = run(answers, seed=11, target=lambda tui=tui: blackjack.main(tui))
+            written = len(result.transcript.encode('utf-8')) - sum(
+                len(answer) + 1 for answer in answers[:len(result.prompts)])
+            sizes.append(written / float(len(result.rounds)))
+        plain, view = sizes
+        self.assertLess(view, 0.8 * plain)
+
+
+    def test_fits_terminal(self):
+        """Is the view only used when the table and a prompt fit?"""
+        game = Game(['foo', 'bar'], 100)
+        self.assertTrue(TableView.fits(game, 80, 24))
+        self.assertFalse(TableView.fits(game, 40, 24))
+        self.assertFalse(TableView.fits(game, 80, 8))
+
+    def test_small_terminal_plays_plain(self):
+        """Does the game fall back to plain output when the table doesn't fit?"""
+        with mock.patch.dict(os.environ, {'COLUMNS': '80', 'LINES': '5'}):
+            result = run(['', ''] + [''] * 10, seed=3, target=lambda: blackjack.main(True))
+        self.assertIn("too small for the table view", result.transcript)
+        self.assertIn("Player > ", result.transcript)
+        self.assertNotIn("\033[1;1H", result.transcript)
+
+    def test_resize_redraws_or_detaches(self):
+        """Is the table redrawn in full on a resize, and given up when too small?"""
+        game = Game(['foo'], 100)
+        sizes = [(80, 24)]
+        out = io.StringIO()
+        view = game.view = TableView(game, 79, out, size=lambda: sizes[-1])
+        view.refresh()
+        start = len(out.getvalue())
+        view.refresh()
+        self.assertEqual(len(out.getvalue()), start)
+        sizes.append((100, 30))
+        view.refresh()
+        self.assertTrue(out.getvalue()[start:].startswith("\033[H\033[J"))
+        self.assertEqual(view.screen.width, 99)
+        view.message('foo', 'busted! :(')
+        sizes.append((100, 6))
+        with mock.patch('sys.stdout', new_callable=io.StringIO) as plain:
+            view.prompt()
+        self.assertIsNone(game.view)
+        self.assertIn("busted! :(", plain.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""Blackjack Table View
+
+Full-screen view of the table for the interactive game. The view keeps
+a model of every cell on the screen and each update writes only the
+cells that changed, rather than clearing and reprinting everything.
+"""
+
+import sys
+from itertools import groupby
+
+from termcolor import COLORS
+
+CLEAR = "\033[H\033[J"
+CLEAR_LINE = "\033[K"
+CLEAR_DOWN = "\033[J"
+MOVE = "\033[{};{}H"
+COLOR = "\033[{}m{}\033[0m"
+BLANK = (' ', None)
+INDENT = "  "
+# unchanged cells shorter than a cursor move are cheaper to rewrite
+GAP = 8
+# narrowest table shown, and rows kept free below it for a prompt, a
+# wrapped prompt and the line its answer ends on
+MIN_WIDTH = 60
+PROMPT_ROWS = 3
+
+
+class Screen(object):
+    """Model of the terminal contents, writing only the cells that change"""
+
+    def __init__(self, height, width, out=None):
+        self.height = height
+        self.width = width
+        self.out = out or sys.stdout
+        self.cells = None
+        self.written = 0
+
+    def __write(self, text):
+        """Send text to the terminal, counting the bytes"""
+        self.written += len(text.encode('utf-8'))
+        self.out.write(text)
+
+    def layout(self, lines):
+        """Convert lines of (text, color) segments into rows of cells"""
+        rows = []
+        for line in lines[:self.height]:
+            row = []
+            for text, color in line:
+                row.extend((char, color) for char in text)
+            row = row[:self.width]
+            row.extend([BLANK] * (self.width - len(row)))
+            rows.append(row)
+        rows.extend([[BLANK] * self.width for _ in range(self.height - len(rows))])
+        return rows
+
+    def update(self, lines):
+        """Bring the terminal up to date with the given lines"""
+        rows = self.layout(lines)
+        if self.cells is None:
+            self.__write(CLEAR)
+            self.cells = [[BLANK] * self.width for _ in range(self.height)]
+        for number, (old, new) in enumerate(zip(self.cells, rows)):
+            tail = len(new)
+            while tail and new[tail - 1] == BLANK:
+                tail -= 1
+            for start, end in self.changes(old, new):
+                self.__write(MOVE.format(number + 1, start + 1))
+                if end > tail:
+                    # the rest of the row is blank, so erase it instead
+                    self.__write(self.render(new[start:tail]) + CLEAR_LINE)
+                    break
+                self.__write(self.render(new[start:end]))
+        self.cells = rows
+        self.out.flush()
+
+    @staticmethod
+    def changes(old, new):
+        """Yield (start, end) runs of changed cells, merging small gaps"""
+        start = end = None
+        for col, (was, now) in enumerate(zip(old, new)):
+            if was == now:
+                continue
+            if start is not None and col - end > GAP:
+                yield start, end
+                start = None
+            if start is None:
+                start = col
+            end = col + 1
+        if start is not None:
+            yield start, end
+
+    @staticmethod
+    def render(cells):
+        """Text for a run of cells, colouring each same-coloured stretch"""
+        text = []
+        for color, group in groupby(cells, key=lambda cell: cell[1]):
+            run = ''.join(char for char, _ in group)
+            text.append(COLOR.format(COLORS[color], run) if color else run)
+        return ''.join(text)
+
+    def park(self, row):
+        """Move the cursor to the start of row, clearing it and the rows below"""
+        self.__write(MOVE.format(row, 1) + CLEAR_DOWN)
+        self.out.flush()
+
+
+class TableView(object):
+    """Shows the dealer and each player's chips, hands and latest message
+
+    Every seat has a row for its cards and a row beneath it for its
+    messages since the screen was last redrawn, keeping the latest ones
+    when they don't all fit. Messages are drawn along with the next change
+    of cards or question, so each redraw only rewrites the cells that
+    differ from the previous one. Only the seat names are coloured, as
+    every change to a coloured run costs its escape codes again.
+
+    Given size, a function returning the terminal's columns and lines,
+    the view is redrawn in full whenever the terminal is resized, and
+    hands the game back to plain output if the table no longer fits.
+    """
+
+    def __init__(self, game, width=80, out=None, size=None):
+        self.game = game
+        self.status = {}
+        self.shown = set()
+        self.size = size
+        self.detached = False
+        self.terminal = tuple(size()) if size else None
+        self.screen = Screen(self.height(game), width, out)
+
+    @staticmethod
+    def height(game):
+        """Rows taken by the table for the game"""
+        return 1 + 2 * (len(game.players) + 1)
+
+    @classmethod
+    def fits(cls, game, columns, lines):
+        """Is a terminal of the given size big enough for the game's table?"""
+        return columns > MIN_WIDTH and lines >= cls.height(game) + PROMPT_ROWS
+
+    def resized(self):
+        """Follow any change in the terminal size, returning False once detached"""
+        if self.detached:
+            return False
+        terminal = tuple(self.size()) if self.size else None
+        if terminal == self.terminal:
+            return True
+        self.terminal = columns, lines = terminal
+        out = self.screen.out
+        if not self.fits(self.game, columns, lines):
+            out.write(CLEAR)
+            out.flush()
+            self.game.view = None
+            self.detached = True
+            for name, texts in self.status.items():
+                if name not in self.shown:
+                    for text in texts:
+                        self.game.say(name, text)
+            return False
+        # a new screen model clears the terminal and draws every cell
+        self.screen = Screen(self.screen.height, columns - 1, out)
+        return True
+
+    def message(self, name, text, color="white"):
+        """Add the message to the seat's status row"""
+        # pylint: disable=unused-argument
+        if name in self.status and name not in self.shown:
+            self.status[name].append(text)
+        else:
+            self.status[name] = [text]
+        self.shown.discard(name)
+
+    def status_text(self, name):
+        """The seat's latest messages that fit on its status row"""
+        room = self.screen.width - len(INDENT)
+        text = ""
+        for message in reversed(self.status.get(name, ())):
+            joined = "{}  {}".format(message, text) if text else message
+            if len(joined) > room:
+                break
+            text = joined
+        return text
+
+    def seat(self, name, color, cards):
+        """The two lines for a seat: its cards and its latest messages"""
+        label = "{} > ".format(name.rjust(self.game.max_name_len))
+        return [[(label, color)] + cards, [(INDENT + self.status_text(name), None)]]
+
+    def frame(self):
+        """Lines of (text, color) segments describing the table"""
+        game = self.game
+        lines = [[("Blackjack", 'white'), ("   round {}".format(game.round), None)]]
+        dealer = game.dealer
+        if dealer is None or not dealer.cards:
+            cards = ""
+        elif game.reveal:
+            cards = "{:>2} : {}".format(dealer.value(), dealer)
+        else:
+            cards = "   : {}  ??".format(dealer.first())
+        lines.extend(self.seat("Dealer", 'white', [(cards, None)]))
+        for player in sorted(game.players, key=lambda p: p.name):
+            hands = "  |  ".join("{:>2} : {}".format(h.value(), h)
+                                 for h in player.hands if h.cards)
+            lines.extend(self.seat(player.name, player.color,
+                                   [("chips {:>4}  {}".format(player.chips, hands), None)]))
+        return lines
+
+    def refresh(self):
+        """Redraw the changed cells"""
+        if self.resized():
+            self.screen.update(self.frame())
+            self.shown.update(self.status)
+
+    def prompt(self):
+        """Redraw, leaving the cursor at the start of the row below the table"""
+        self.refresh()
+        if not self.detached:
+            self.screen.park(self.screen.height + 1)
+
+    def close(self):
+        """Redraw, leaving the cursor below the view"""
+        self.refresh()
+        if not self.detached:
+            self.screen.park(self.screen.height + 2)